@@ -0,0 +1,31 @@
+"""
+Gunicorn settings, read from the working directory on startup.
+
+Threaded sync workers: each request holds a thread for as long as it
+runs, slow clients included, so GUNICORN_THREADS bounds the requests a
+worker serves at once. There is no ASGI mode: the views spend their time
+in the ORM, which Django runs one query at a time on a thread even from
+async code, so uvicorn workers only added a thread hand-off per request.
+"""
+
+import os
+
+wsgi_app = "krex.wsgi:application"
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# The hooks below run in the master, before Django is set up
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "krex.settings")
+
+
+def on_starting(server):
+    # Workers of an earlier run are gone; keep their counts, not their files
+    from krexapp import metrics
+
+    metrics.archive_workers()
+
+
+def child_exit(server, worker):
+    from krexapp import metrics
+
+    metrics.mark_process_dead(worker.pid)
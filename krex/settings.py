@@ -4,8 +4,11 @@ Django settings for krex project.
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
+from krex.database import database_config
+
 # ==========================================================
 # BASE DIRECTORY
 # ==========================================================
@@ -41,14 +44,17 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # ==========================================================
 MIDDLEWARE = [
+    'krexapp.metrics.MetricsMiddleware',  # first, so it times everything below
+    'krexapp.replicas.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'krexapp.middleware.QueryInspectorMiddleware',
 ]
 
 ROOT_URLCONF = 'krex.urls'
@@ -58,7 +64,7 @@ ROOT_URLCONF = 'krex.urls'
 # ==========================================================
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'krexapp.metrics.TimedDjangoTemplates',  # DjangoTemplates + render timing
         'DIRS': [BASE_DIR / 'templates'],  # global templates folder
         'APP_DIRS': True,
         'OPTIONS': {
@@ -68,6 +74,8 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'krexapp.context_processors.admin_status',
+                'krexapp.context_processors.watchlist_membership',
+                'krexapp.context_processors.catalog_cache',
             ],
         },
     },
@@ -78,13 +86,68 @@ WSGI_APPLICATION = 'krex.wsgi.application'
 # ==========================================================
 # DATABASE
 # ==========================================================
+# DATABASE_URL picks the backend: postgres://... in production, SQLite
+# in WAL mode by default. Pooling and timeouts are in krex/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(os.getenv("DATABASE_URL", "sqlite:///db.sqlite3"), BASE_DIR),
 }
 
+# ==========================================================
+# READ REPLICAS
+# ==========================================================
+# Comma-separated DATABASE_URLs; catalog reads during web requests are
+# spread across them (see krexapp/replicas.py). Pointing one at the
+# primary's own URL gives a local stand-in; in tests each mirrors default
+DATABASE_REPLICAS = []
+for _index, _url in enumerate(filter(None, os.getenv("DATABASE_REPLICA_URLS", "").split(",")), 1):
+    DATABASES[f'replica{_index}'] = {
+        **database_config(_url.strip(), BASE_DIR),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{_index}')
+
+DATABASE_ROUTERS = ['krexapp.replicas.ReplicaRouter']
+
+# The replicas' worst lag: how long a session reads from the primary after
+# it writes, and every request after a catalog change
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", "10"))
+
+# ==========================================================
+# CACHE (pages, rails, watchlists, watch progress and versions)
+# ==========================================================
+# Shared by every gunicorn worker, and holding a few entries per active
+# user besides the catalog's: their watchlist IDs, page version and
+# recent watch progress. At the seeded scale (100k users) that is
+# hundreds of thousands of entries, so production needs REDIS_URL, with
+# maxmemory-policy volatile-lru so the version keys, stored without a
+# timeout, are never the ones evicted.
+#
+# Without it entries go to files, for development only: every write
+# lists the whole directory and culls it once it passes MAX_ENTRIES,
+# evicting user versions (and with them the ETags of their pages).
+# `manage.py check --deploy` warns about it
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': os.getenv(
+                "DJANGO_CACHE_BACKEND", 'django.core.cache.backends.filebased.FileBasedCache'
+            ),
+            'LOCATION': os.getenv(
+                "DJANGO_CACHE_LOCATION", os.path.join(tempfile.gettempdir(), 'krex-cache')
+            ),
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv("DJANGO_CACHE_MAX_ENTRIES", 20_000))},
+        }
+    }
+
 # ==========================================================
 # PASSWORD VALIDATION
 # ==========================================================
@@ -116,6 +179,29 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'    # for production collectstatic
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# ==========================================================
+# VIDEO PROCESSING (HLS transcoding via ffmpeg)
+# ==========================================================
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
+
+# Resumable admin uploads: largest slice accepted per PUT (bytes)
+CHUNKED_UPLOAD_MAX_CHUNK = int(os.getenv("CHUNKED_UPLOAD_MAX_CHUNK", 16 * 1024 * 1024))
+
+# ==========================================================
+# QUERY INSPECTOR (N+1 and query-budget warnings per request)
+# ==========================================================
+QUERY_INSPECTOR = os.getenv("QUERY_INSPECTOR", str(DEBUG)).lower() in ("1", "true", "yes")
+QUERY_INSPECTOR_REPEAT_THRESHOLD = int(os.getenv("QUERY_INSPECTOR_REPEAT_THRESHOLD", 5))
+QUERY_INSPECTOR_BUDGET = int(os.getenv("QUERY_INSPECTOR_BUDGET", 25))
+
+# ==========================================================
+# METRICS (Server-Timing headers and /metrics, see krexapp/metrics.py)
+# ==========================================================
+# Each gunicorn worker writes its counters here for /metrics to merge
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), 'krex-metrics'))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+
 # ==========================================================
 # DEFAULT PRIMARY KEY
 # ==========================================================
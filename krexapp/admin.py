@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Movie, TvShows, Episode
+from .models import Movie, TvShows, Episode, Job
 
 
 # ================= MOVIE ADMIN =================
@@ -13,7 +13,8 @@ class MovieAdmin(admin.ModelAdmin):
         'is_trending',
         'is_hindi',
         'is_english',
-        'top_rank'
+        'top_rank',
+        'video_hls_status'
     )
     list_filter = ('language', 'is_trending', 'is_hindi', 'is_english')
     search_fields = ('title',)
@@ -50,6 +51,15 @@ class TvShowsAdmin(admin.ModelAdmin):
 
 @admin.register(Episode)
 class EpisodeAdmin(admin.ModelAdmin):
-    list_display = ('tvshow', 'season', 'episode_number', 'title')
+    list_display = ('tvshow', 'season', 'episode_number', 'title', 'video_hls_status')
     list_filter = ('tvshow', 'season')
-    search_fields = ('title',)
\ No newline at end of file
+    search_fields = ('title',)
+
+
+# ================= BACKGROUND JOBS =================
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('locked_by', 'locked_at', 'heartbeat_at', 'result', 'error', 'created_at', 'finished_at')
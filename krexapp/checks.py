@@ -0,0 +1,30 @@
+"""
+System checks for what the app expects of its settings.
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backends that can't hold an entry per active user for every worker
+LOCAL_CACHES = {
+    'django.core.cache.backends.filebased.FileBasedCache': 'file-based',
+    'django.core.cache.backends.locmem.LocMemCache': 'local to each process',
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in LOCAL_CACHES:
+        return []
+
+    return [
+        Warning(
+            f'The default cache is {LOCAL_CACHES[backend]}.',
+            hint=(
+                'Set REDIS_URL. Watchlists, watch progress and page versions keep '
+                'entries per user, which this backend evicts or slows down on.'
+            ),
+            id='krexapp.W001',
+        )
+    ]
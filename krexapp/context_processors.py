@@ -1,4 +1,24 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import pagecache, watchlists
+
+
 def admin_status(request):
     return {
         'is_admin_user': request.user.is_authenticated and request.user.is_staff
-    }
\ No newline at end of file
+    }
+
+
+def watchlist_membership(request):
+    # Lazy, so pages that never check membership don't load it
+    return {
+        'user_watchlist': SimpleLazyObject(lambda: watchlists.for_request(request))
+    }
+
+
+def catalog_cache(request):
+    # Key and timeout of the shared {% cache %} fragments
+    return {
+        'catalog_version': SimpleLazyObject(pagecache.version),
+        'catalog_timeout': pagecache.TIMEOUT,
+    }
@@ -0,0 +1,150 @@
+"""
+Resized, modern-format variants of posters, banners and thumbnails.
+
+Derivatives live under ``MEDIA_ROOT/derivatives/<original name>/`` as
+``<width>.<format>``. They are built by a background job right after an
+upload and, failing that, on the first request for them; after that they
+are plain files on disk.
+"""
+
+import os
+import tempfile
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils._os import safe_join
+from PIL import Image, ImageOps, features
+
+# name -> (widths, sizes attribute)
+PRESETS = {
+    'card': ((160, 240, 320, 480), '200px'),
+    'thumb': ((160, 320, 480), '(max-width: 600px) 50vw, 240px'),
+    'banner': ((640, 1024, 1440, 1920), '100vw'),
+}
+
+WIDTHS = sorted({width for widths, sizes in PRESETS.values() for width in widths})
+
+# Preferred first; 'jpeg' is the <img> fallback every browser understands
+FORMATS = tuple(
+    fmt for fmt in ('avif', 'webp', 'jpeg')
+    if fmt == 'jpeg' or features.check(fmt)
+)
+
+CONTENT_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+
+SAVE_OPTIONS = {
+    'avif': {'quality': 55, 'speed': 8},
+    'webp': {'quality': 78, 'method': 4},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def derivatives_root():
+    return Path(settings.MEDIA_ROOT) / 'derivatives'
+
+
+def derivative_name(name, width, fmt):
+    # The original's extension stays: posters/a.jpg and posters/a.png are
+    # different images and must not share derivatives
+    return (PurePosixPath(name) / f'{width}.{fmt}').as_posix()
+
+
+def derivative_path(name, width, fmt):
+    # SuspiciousFileOperation for names reaching outside the directory
+    return Path(safe_join(derivatives_root(), derivative_name(name, width, fmt)))
+
+
+def derivative_url(name, width, fmt):
+    return reverse('image_derivative', args=[width, fmt, name])
+
+
+def candidates(name, widths, fmt):
+    return ', '.join(f'{derivative_url(name, width, fmt)} {width}w' for width in widths)
+
+
+def picture_data(image, preset='card'):
+    """
+    What ``{% responsive_image %}`` renders, as a dict for JSON clients
+    that build the ``<picture>`` themselves. None for an empty field.
+    """
+    if not image:
+        return None
+
+    name = image.name
+    widths, sizes = PRESETS[preset]
+    return {
+        'src': derivative_url(name, widths[len(widths) // 2], 'jpeg'),
+        'srcset': candidates(name, widths, 'jpeg'),
+        'sizes': sizes,
+        'sources': [
+            {'type': CONTENT_TYPES[fmt], 'srcset': candidates(name, widths, fmt)}
+            for fmt in FORMATS if fmt != 'jpeg'
+        ],
+    }
+
+
+# ================= GENERATION =================
+
+def render(source, width, fmt):
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+
+        if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGBA')
+
+        return image.copy()
+
+
+def generate(name, width, fmt):
+    """Build one derivative of the stored image ``name`` if it is missing."""
+    # ``name`` comes from the URL; both lookups refuse to leave MEDIA_ROOT
+    source = default_storage.path(name)
+    path = derivative_path(name, width, fmt)
+    if path.exists():
+        return path
+
+    image = render(source, width, fmt)
+
+    # Write-then-rename so concurrent requests never serve a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=f'.{fmt}.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            image.save(fh, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+        os.replace(tmp, path)
+    except Exception:
+        os.unlink(tmp)
+        raise
+
+    return path
+
+
+def preset_widths(presets):
+    return sorted({width for preset in presets for width in PRESETS[preset][0]})
+
+
+def generate_all(name, presets=tuple(PRESETS)):
+    created = []
+    for width in preset_widths(presets):
+        for fmt in FORMATS:
+            if not derivative_path(name, width, fmt).exists():
+                generate(name, width, fmt)
+                created.append(derivative_name(name, width, fmt))
+    return created
+
+
+def has_derivatives(name, presets=tuple(PRESETS)):
+    # generate_all writes the widest JPEG last
+    return derivative_path(name, preset_widths(presets)[-1], FORMATS[-1]).exists()
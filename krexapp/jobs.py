@@ -0,0 +1,189 @@
+"""
+Database-backed job queue.
+
+Jobs are rows in ``Job``; workers (``manage.py run_jobs``) claim them with
+a conditional UPDATE so several workers can share the table without an
+external broker or ``SELECT ... FOR UPDATE SKIP LOCKED`` support.
+
+While a task runs, a thread of the worker refreshes the job's
+``heartbeat_at`` every ``HEARTBEAT_SECONDS``. A running job whose
+heartbeat stops for ``STALE_AFTER`` belonged to a worker that died and
+goes back to the queue; one that is merely slow, like a full-ladder
+transcode of a long film, keeps its claim however long it takes.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+RETRY_BASE_SECONDS = 30
+HEARTBEAT_SECONDS = 30
+STALE_AFTER = timedelta(minutes=5)
+
+
+# ================= REGISTRY =================
+
+def task(name):
+    """Register a function as a queue task under ``name``."""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, /, delay=0, max_attempts=3, **payload):
+    """
+    Queue ``name`` to run with ``payload`` as keyword arguments.
+
+    Inside a transaction the row is only created once it commits, so a
+    worker never picks up a job for data it cannot see yet.
+    """
+    def create():
+        Job.objects.create(
+            task=name,
+            payload=payload,
+            max_attempts=max_attempts,
+            run_after=timezone.now() + timedelta(seconds=delay),
+        )
+
+    transaction.on_commit(create)
+
+
+# ================= WORKER =================
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status=JobStatus.QUEUED,
+        run_after__lte=now
+    ).order_by('run_after', 'id').values_list('id', flat=True)[:10]
+
+    for job_id in candidates:
+        claimed = Job.objects.filter(id=job_id, status=JobStatus.QUEUED).update(
+            status=JobStatus.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+
+    return None
+
+
+def beat(job):
+    Job.objects.filter(
+        id=job.id, locked_by=job.locked_by, status=JobStatus.RUNNING
+    ).update(heartbeat_at=timezone.now())
+
+
+@contextmanager
+def heartbeat(job, interval=HEARTBEAT_SECONDS):
+    """Keep ``job``'s claim fresh from a background thread during the block."""
+    stopped = threading.Event()
+
+    def keep_beating():
+        try:
+            while not stopped.wait(interval):
+                try:
+                    beat(job)
+                except DatabaseError:
+                    # Missed beats only matter once STALE_AFTER has passed
+                    logger.exception('Could not refresh the heartbeat of job %s', job.pk)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=keep_beating, name=f'job-{job.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def run(job):
+    func = TASKS.get(job.task)
+    rows = Job.objects.filter(id=job.id, locked_by=job.locked_by)
+
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task {job.task!r}')
+        with heartbeat(job):
+            result = func(**job.payload)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.task)
+
+        retry = job.attempts < job.max_attempts and job.task in TASKS
+        rows.update(
+            status=JobStatus.QUEUED if retry else JobStatus.FAILED,
+            run_after=timezone.now() + timedelta(
+                seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            ),
+            error=traceback.format_exc()[-4000:],
+            locked_by='',
+            locked_at=None,
+            heartbeat_at=None,
+            finished_at=None if retry else timezone.now(),
+        )
+        return False
+
+    rows.update(
+        status=JobStatus.DONE,
+        heartbeat_at=None,
+        result=result,
+        error='',
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def requeue_stale(older_than=STALE_AFTER):
+    """Give jobs held by a worker that died mid-run back to the queue."""
+    return Job.objects.filter(
+        status=JobStatus.RUNNING,
+        heartbeat_at__lt=timezone.now() - older_than
+    ).update(status=JobStatus.QUEUED, locked_by='', locked_at=None, heartbeat_at=None)
+
+
+def work(burst=False, sleep=5, worker=None):
+    """
+    Process jobs until the queue is empty (``burst``) or forever.
+    Returns the number of jobs run.
+    """
+    worker = worker or worker_id()
+    processed = 0
+    requeue_stale()
+
+    while True:
+        job = claim(worker)
+
+        if job is None:
+            if burst:
+                return processed
+            time.sleep(sleep)
+            requeue_stale()
+            continue
+
+        run(job)
+        processed += 1
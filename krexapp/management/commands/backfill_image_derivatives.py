@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from krexapp.tasks import IMAGE_FIELDS, queue_image_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Queue derivative generation for every existing poster, banner and thumbnail.'
+
+    def handle(self, *args, **options):
+        for model, fields in IMAGE_FIELDS.items():
+            queryset = model.objects.only('pk', *fields)
+            for instance in queryset.iterator():
+                queue_image_derivatives(instance)
+
+            self.stdout.write(f'{model.__name__}: checked {queryset.count()} row(s).')
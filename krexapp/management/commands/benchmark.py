@@ -0,0 +1,272 @@
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.client import HTTPConnection
+from threading import local
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from krexapp.models import Episode, Movie, TvShows, Watchlist
+from krexapp.management.commands.seed_catalog import USERNAME_PREFIX
+
+# Queries for live_search: whole words, prefixes, Devanagari and typos
+SEARCH_QUERIES = ('dil', 'dilwale', 'zindagi', 'ज़िंदगी', 'shadw', 'night cit', 'sapne', 'empre')
+
+VIEWS = (
+    'movies', 'tv_shows', 'movie_detail', 'shows_detail',
+    'episode_detail', 'live_search', 'watchlist',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure throughput and p50/p95/p99 latency of the public views, '
+        'in-process and/or against a local gunicorn, and write a JSON report.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode', choices=('in-process', 'gunicorn', 'both'), default='in-process'
+        )
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per view.')
+        parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per view first.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Client threads (gunicorn mode).')
+        parser.add_argument('--views', nargs='+', choices=VIEWS, default=list(VIEWS))
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for picking objects.')
+        parser.add_argument('--output', default='benchmark.json', help='Report path ("-" for stdout).')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--gunicorn-args', default='--workers 2',
+            help='Extra arguments for the gunicorn server.'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('--requests must be at least 2 to compute percentiles.')
+
+        self.random = random.Random(options['seed'])
+        self.user = self.benchmark_user()
+        self.samples = self.sample_ids()
+
+        results = {}
+        if options['mode'] in ('in-process', 'both'):
+            results['in-process'] = self.run_in_process(options)
+        if options['mode'] in ('gunicorn', 'both'):
+            results['gunicorn'] = self.run_gunicorn(options)
+
+        report = {
+            'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'database': connection.vendor,
+            'catalog': {
+                'movies': Movie.objects.count(),
+                'shows': TvShows.objects.count(),
+                'episodes': Episode.objects.count(),
+                'users': User.objects.count(),
+                'watchlist_items': Watchlist.objects.count(),
+            },
+            'config': {
+                key: options[key]
+                for key in ('requests', 'warmup', 'concurrency', 'seed', 'gunicorn_args')
+            },
+            'results': results,
+        }
+
+        text = json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False)
+        if options['output'] == '-':
+            self.stdout.write(text)
+        else:
+            with open(options['output'], 'w') as fh:
+                fh.write(text + '\n')
+            self.stdout.write(f'Report written to {options["output"]}')
+
+    # ================= TARGETS =================
+
+    def benchmark_user(self):
+        user = (
+            User.objects.filter(username__startswith=USERNAME_PREFIX)
+            .annotate(items=Count('watchlist')).filter(items__gt=0).first()
+        )
+        if user is None:
+            raise CommandError('No benchmark users with watchlists; run seed_catalog first.')
+        return user
+
+    def sample_ids(self):
+        samples = {
+            'movie_detail': list(Movie.objects.values_list('id', flat=True)[:1000]),
+            'shows_detail': list(TvShows.objects.values_list('id', flat=True)[:1000]),
+            'episode_detail': list(Episode.objects.values_list('id', flat=True)[:1000]),
+        }
+        for view, ids in samples.items():
+            if not ids:
+                raise CommandError(f'Nothing to request for {view}; run seed_catalog first.')
+        return samples
+
+    def url(self, view):
+        """A request for ``view``, picking a different object each time."""
+        if view in self.samples:
+            return reverse(view, args=[self.random.choice(self.samples[view])])
+        if view == 'live_search':
+            query = self.random.choice(SEARCH_QUERIES)
+            return f'{reverse(view)}?{urlencode({"q": query})}'
+        return reverse(view)
+
+    # ================= IN-PROCESS =================
+
+    def run_in_process(self, options):
+        """Django's test client: the view stack without any network or server."""
+        client = Client(raise_request_exception=False, SERVER_NAME=host_name())
+        client.force_login(self.user)
+
+        def request(url):
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response.status_code
+
+        results = {}
+        for view in options['views']:
+            for _ in range(options['warmup']):
+                request(self.url(view))
+
+            urls = [self.url(view) for _ in range(options['requests'])]
+            started = time.perf_counter()
+            timings = [timed(request, url) for url in urls]
+            results[view] = summarize(timings, time.perf_counter() - started)
+            self.report_line('in-process', view, results[view])
+
+        return results
+
+    # ================= GUNICORN =================
+
+    def run_gunicorn(self, options):
+        """A real server on localhost, driven by ``concurrency`` keep-alive clients."""
+        # Log in through the session backend both processes share
+        client = Client()
+        client.force_login(self.user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+        server = start_gunicorn(options['port'], options['gunicorn_args'])
+        try:
+            wait_for_port(options['port'], server)
+            results = {}
+            for view in options['views']:
+                results[view] = self.load(view, options, cookie)
+                self.report_line('gunicorn', view, results[view])
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        return results
+
+    def load(self, view, options, cookie):
+        connections = local()
+        headers = {'Host': host_name(), 'Cookie': cookie}
+
+        def request(url):
+            if not hasattr(connections, 'conn'):
+                connections.conn = HTTPConnection('127.0.0.1', options['port'], timeout=60)
+            conn = connections.conn
+            try:
+                conn.request('GET', url, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                return response.status
+            except (OSError, ConnectionError):
+                conn.close()
+                del connections.conn
+                return 599
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            warmup = [self.url(view) for _ in range(options['warmup'])]
+            list(pool.map(request, warmup))
+
+            urls = [self.url(view) for _ in range(options['requests'])]
+            started = time.perf_counter()
+            timings = list(pool.map(lambda url: timed(request, url), urls))
+            elapsed = time.perf_counter() - started
+
+        return summarize(timings, elapsed)
+
+    def report_line(self, mode, view, result):
+        self.stdout.write(
+            f'{mode:>10}  {view:<15} {result["throughput_rps"]:>8.1f} req/s  '
+            f'p50 {result["p50_ms"]:>7.1f}  p95 {result["p95_ms"]:>7.1f}  '
+            f'p99 {result["p99_ms"]:>7.1f} ms  errors {result["errors"]}'
+        )
+
+
+# ================= MEASUREMENT =================
+
+def timed(request, url):
+    started = time.perf_counter()
+    status = request(url)
+    return time.perf_counter() - started, status
+
+
+def summarize(timings, elapsed):
+    latencies = sorted(seconds * 1000 for seconds, status in timings)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': len(timings),
+        'errors': sum(1 for seconds, status in timings if status >= 400),
+        'throughput_rps': round(len(timings) / elapsed, 2),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'p50_ms': round(cuts[49], 2),
+        'p95_ms': round(cuts[94], 2),
+        'p99_ms': round(cuts[98], 2),
+        'max_ms': round(latencies[-1], 2),
+    }
+
+
+def host_name():
+    # A name ALLOWED_HOSTS accepts; '.example.com' entries match subdomains
+    host = next((h for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+    return f'bench{host}' if host.startswith('.') else host
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_gunicorn(port, extra_args):
+    # The app and worker class come from gunicorn.conf.py, as in the Procfile
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+        *extra_args.split(),
+    ]
+    return subprocess.Popen(command, cwd=settings.BASE_DIR, env=os.environ.copy())
+
+
+def wait_for_port(port, server, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError(f'gunicorn exited with status {server.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'gunicorn did not start listening on port {port}')
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from krexapp import rails, recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Precompute related titles for the detail pages from watchlist '
+        'co-occurrence and content similarity. Run after catalog changes, '
+        'e.g. nightly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--catalog', nargs='+', choices=list(rails.CATALOGS), default=list(rails.CATALOGS)
+        )
+        parser.add_argument(
+            '--top-k', type=int, default=recommendations.TOP_K,
+            help='Neighbours stored per title.'
+        )
+
+    def handle(self, *args, **options):
+        for catalog in options['catalog']:
+            started = time.monotonic()
+            count = recommendations.build(catalog, top_k=options['top_k'])
+            self.stdout.write(
+                f'{catalog}: related titles for {count} title(s) '
+                f'in {time.monotonic() - started:.1f}s'
+            )
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from krexapp.models import ChunkedUpload
+from krexapp.uploads import discard_upload
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked uploads that have not been touched for a while.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=48,
+            help='Age in hours after which an idle upload is discarded (default: 48).'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = ChunkedUpload.objects.filter(updated_at__lt=cutoff)
+
+        count = 0
+        for upload in stale.iterator():
+            discard_upload(upload)
+            count += 1
+
+        self.stdout.write(f'{count} stale upload(s) removed.')
@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from krexapp import pagecache, previews
+from krexapp.models import Episode
+from krexapp.tasks import MEDIA_MODELS, current_rows, preview_dir, preview_root, save_thumbnail
+
+
+class Command(BaseCommand):
+    help = (
+        'Build seek-preview sprite sheets (and missing episode thumbnails) '
+        'for the whole catalog using a process pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Worker processes (default: one per CPU core).'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Rebuild previews that already exist.'
+        )
+
+    def jobs(self, rebuild):
+        for model, cls in MEDIA_MODELS.items():
+            queryset = cls.objects.exclude(video='').exclude(video__isnull=True)
+            if not rebuild:
+                queryset = queryset.filter(previews_vtt='')
+
+            for instance in queryset.iterator():
+                wants_thumbnail = isinstance(instance, Episode) and not instance.thumbnail
+                yield model, instance, wants_thumbnail
+
+    def handle(self, *args, **options):
+        # Children only see file paths; spawn avoids forking OpenCV's threads
+        context = multiprocessing.get_context('spawn')
+        done = failed = 0
+
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as pool:
+            futures = {}
+            for model, instance, wants_thumbnail in self.jobs(options['all']):
+                out_dir = preview_dir(model, instance.pk)
+                thumbnail = out_dir / 'thumbnail.jpg' if wants_thumbnail else None
+                future = pool.submit(previews.process_video, instance.video.path, str(out_dir), thumbnail and str(thumbnail))
+                futures[future] = (model, instance)
+
+            for future in as_completed(futures):
+                model, instance = futures[future]
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{model} {instance.pk}: {exc}')
+                    continue
+
+                self.save(instance, result)
+                done += 1
+
+        self.stdout.write(f'{done} video(s) processed, {failed} failed.')
+
+    def save(self, instance, result):
+        vtt = Path(result['vtt']).relative_to(preview_root()).as_posix()
+        pagecache.update(current_rows(instance), previews_vtt=vtt)
+
+        if result['thumbnail']:
+            save_thumbnail(instance, result['thumbnail'])
+            os.unlink(result['thumbnail'])
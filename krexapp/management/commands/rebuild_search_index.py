@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from krexapp import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the live search index from the catalog tables.'
+
+    def handle(self, *args, **options):
+        count = search.rebuild()
+        self.stdout.write(f'{count} document(s) indexed.')
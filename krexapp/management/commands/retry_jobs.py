@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from krexapp.jobs import requeue_stale
+from krexapp.models import Job, JobStatus
+
+
+class Command(BaseCommand):
+    help = 'Requeue failed jobs and jobs stuck on a worker that died.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--task', help='Only requeue jobs for this task name.')
+
+    def handle(self, *args, **options):
+        failed = Job.objects.filter(status=JobStatus.FAILED)
+        if options['task']:
+            failed = failed.filter(task=options['task'])
+
+        requeued = failed.update(
+            status=JobStatus.QUEUED,
+            attempts=0,
+            run_after=timezone.now(),
+            finished_at=None,
+        )
+        stale = requeue_stale()
+
+        self.stdout.write(f'{requeued} failed and {stale} stale job(s) requeued.')
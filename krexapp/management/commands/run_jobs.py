@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from krexapp import tasks  # noqa: F401  (registers the task functions)
+from krexapp.jobs import work
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs (checksums, probing, thumbnails, HLS renditions).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=5,
+            help='Seconds to wait between polls when the queue is empty (default: 5).'
+        )
+
+    def handle(self, *args, **options):
+        processed = work(burst=options['burst'], sleep=options['sleep'])
+        self.stdout.write(f'{processed} job(s) processed.')
@@ -0,0 +1,203 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from krexapp import pagecache, rails, search
+from krexapp.models import Episode, Movie, TvShows, Watchlist
+
+USERNAME_PREFIX = 'bench-user-'
+
+# Mixed-script vocabulary so search is exercised the way real titles are
+WORDS = (
+    'dil dilwale dulhania zindagi sholay deewar pyaar ishq safar raat din '
+    'kal aaj duniya sapne jung dost yaari kahani raaz khel shaadi '
+    'दिल ज़िंदगी प्यार सफ़र कहानी दोस्ती '
+    'night city shadow river empire storm lost last road home king '
+    'secret fire winter dream blood stone silent ocean wild star'
+).split()
+LANGUAGES = ('Hindi', 'English', 'Tamil', 'Telugu')
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with a synthetic catalog, users and watchlists '
+        'for benchmarking. Use on a throwaway database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=50_000)
+        parser.add_argument('--shows', type=int, default=5_000)
+        parser.add_argument('--seasons', type=int, default=10, help='Seasons per show.')
+        parser.add_argument('--episodes', type=int, default=10, help='Episodes per season.')
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--watchlist', type=int, default=20, help='Watchlist items per user.')
+        parser.add_argument('--batch-size', type=int, default=2_000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible catalogs.')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete every movie, show and benchmark user first.'
+        )
+        parser.add_argument(
+            '--no-index', action='store_true',
+            help='Skip rebuilding the search index (live_search will find nothing).'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        if options['clear']:
+            self.clear()
+
+        movie_ids = self.create_movies(options['movies'])
+        show_ids = self.create_shows(options['shows'])
+        self.create_episodes(show_ids, options['seasons'], options['episodes'])
+        self.create_users(options['users'], movie_ids, show_ids, options['watchlist'])
+
+        # bulk_create skips the signals that normally keep these current
+        for catalog in rails.CATALOGS:
+            rails.invalidate(catalog)
+        pagecache.invalidate()
+
+        if not options['no_index']:
+            self.stdout.write('Rebuilding search index...')
+            self.stdout.write(f'{search.rebuild()} document(s) indexed.')
+
+    # ================= HELPERS =================
+
+    def title(self):
+        return ' '.join(self.random.sample(WORDS, self.random.randint(1, 4))).title()
+
+    def description(self):
+        return ' '.join(self.random.choices(WORDS, k=30)).capitalize() + '.'
+
+    def flags(self, index):
+        hindi = self.random.random() < 0.5
+        return {
+            'language': 'Hindi' if hindi else self.random.choice(LANGUAGES[1:]),
+            'is_hindi': hindi,
+            'is_english': not hindi and self.random.random() < 0.7,
+            'is_trending': self.random.random() < 0.02,
+            'top_rank': index + 1 if index < rails.TOP_SIZE else None,
+        }
+
+    def bulk_create(self, model, rows, label):
+        created = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch, ignore_conflicts=model is Watchlist)
+                created += len(batch)
+                batch = []
+                self.stdout.write(f'  {label}: {created}', ending='\r')
+        if batch:
+            model.objects.bulk_create(batch, ignore_conflicts=model is Watchlist)
+            created += len(batch)
+        self.stdout.write(f'  {label}: {created}')
+
+    def new_ids(self, model, since):
+        return list(model.objects.filter(pk__gt=since).values_list('pk', flat=True))
+
+    def last_id(self, model):
+        return model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    # ================= SEEDING =================
+
+    @transaction.atomic
+    def clear(self):
+        self.stdout.write('Clearing catalog and benchmark users...')
+        Movie.objects.all().delete()
+        TvShows.objects.all().delete()
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        search.rebuild()
+
+    def create_movies(self, count):
+        since = self.last_id(Movie)
+        self.bulk_create(Movie, (
+            Movie(
+                title=self.title(),
+                description=self.description(),
+                poster=f'posters/bench-{i}.jpg',
+                banner=f'banners/bench-{i}.jpg',
+                release_year=self.random.randint(1960, 2026),
+                **self.flags(i),
+            )
+            for i in range(count)
+        ), 'movies')
+        return self.new_ids(Movie, since)
+
+    def create_shows(self, count):
+        since = self.last_id(TvShows)
+        self.bulk_create(TvShows, (
+            TvShows(
+                title=self.title(),
+                description=self.description(),
+                poster=f'posters/bench-show-{i}.jpg',
+                banner=f'banners/bench-show-{i}.jpg',
+                release_year=self.random.randint(1990, 2026),
+                **self.flags(i),
+            )
+            for i in range(count)
+        ), 'shows')
+        return self.new_ids(TvShows, since)
+
+    def create_episodes(self, show_ids, seasons, per_season):
+        self.bulk_create(Episode, (
+            Episode(
+                tvshow_id=show_id,
+                season=season,
+                episode_number=number,
+                title=self.title(),
+                description=self.description(),
+                video=f'episodes/bench-{show_id}-{season}-{number}.mp4',
+            )
+            for show_id in show_ids
+            for season in range(1, seasons + 1)
+            for number in range(1, per_season + 1)
+        ), 'episodes')
+
+    def create_users(self, count, movie_ids, show_ids, per_user):
+        # One hash for everyone; hashing per user would dominate the run
+        password = make_password('benchmark')
+        since = self.last_id(User)
+        start = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+
+        self.bulk_create(User, (
+            User(username=f'{USERNAME_PREFIX}{start + i}', password=password)
+            for i in range(count)
+        ), 'users')
+
+        if not per_user or not (movie_ids or show_ids):
+            return
+
+        # Watchlist rows copy their title's language and year
+        copied = {
+            model: {pk: (language, year) for pk, language, year in model.objects.values_list(
+                'pk', 'language', 'release_year'
+            )}
+            for model in (Movie, TvShows)
+        }
+
+        def watchlist_row(user_id, model, field, object_id):
+            language, year = copied[model][object_id]
+            return Watchlist(
+                user_id=user_id, language=language, release_year=year, **{field: object_id}
+            )
+
+        def items(user_id):
+            movies = self.random.sample(movie_ids, min(len(movie_ids), per_user - per_user // 4))
+            shows = self.random.sample(show_ids, min(len(show_ids), per_user // 4))
+            for movie_id in movies:
+                yield watchlist_row(user_id, Movie, 'movie_id', movie_id)
+            for show_id in shows:
+                yield watchlist_row(user_id, TvShows, 'tvshow_id', show_id)
+
+        self.bulk_create(Watchlist, (
+            item
+            for user_id in self.new_ids(User, since)
+            for item in items(user_id)
+        ), 'watchlist items')
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from krexapp.jobs import enqueue
+from krexapp.models import Job, JobStatus, TranscodeStatus
+from krexapp.tasks import MEDIA_MODELS
+from krexapp.transcoding import pending_sources
+
+
+class Command(BaseCommand):
+    help = 'Queue HLS transcodes for pending Movie/Episode videos (run by manage.py run_jobs).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Also retry videos whose last transcode failed.'
+        )
+
+    def handle(self, *args, **options):
+        statuses = [TranscodeStatus.PENDING]
+        if options['retry_failed']:
+            statuses.append(TranscodeStatus.FAILED)
+
+        model_names = {model: name for name, model in MEDIA_MODELS.items()}
+        # Transcodes already waiting or running; queuing another would
+        # have two workers writing the same HLS directory
+        queued = {
+            (payload.get('model'), payload.get('pk'), payload.get('field'))
+            for payload in Job.objects.filter(
+                task='media.transcode', status__in=[JobStatus.QUEUED, JobStatus.RUNNING]
+            ).values_list('payload', flat=True)
+        }
+
+        added = 0
+        for instance, source in pending_sources(statuses):
+            key = (model_names[type(instance)], instance.pk, source.field)
+            if key in queued:
+                continue
+            enqueue('media.transcode', model=key[0], pk=key[1], field=key[2])
+            queued.add(key)
+            added += 1
+
+        self.stdout.write(f'{added} transcode job(s) queued.')
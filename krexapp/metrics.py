@@ -0,0 +1,343 @@
+"""
+Request metrics: per-view latency, database time, template render time
+and response size.
+
+``MetricsMiddleware`` times each request, adds a ``Server-Timing`` header
+and records the numbers into an in-process registry of Prometheus-style
+counters and histograms. Gunicorn runs several worker processes, so each
+one periodically writes its registry to ``METRICS_DIR/<pid>.json`` and
+the ``/metrics`` view merges every worker's file into one exposition.
+
+When a worker exits, gunicorn's ``child_exit`` hook (gunicorn.conf.py)
+folds its file into ``archive.json`` and deletes it, so counters keep
+the counts of recycled workers without a file per dead pid, and never
+go backwards when a new worker is given an old pid.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: runserver's single process has nothing to race
+    fcntl = None
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+from .middleware import wrapped_connections
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 10_000_000)
+
+# name -> (type, help, buckets or None)
+METRICS = {
+    'krex_requests_total': ('counter', 'Requests served', None),
+    'krex_request_duration_seconds': ('histogram', 'Time spent in the view stack', LATENCY_BUCKETS),
+    'krex_db_duration_seconds': ('histogram', 'Time spent in SQL per request', LATENCY_BUCKETS),
+    'krex_db_queries_total': ('counter', 'SQL statements run', None),
+    'krex_template_render_seconds': ('histogram', 'Time spent rendering templates per request', LATENCY_BUCKETS),
+    'krex_response_size_bytes': ('histogram', 'Response body size', SIZE_BUCKETS),
+}
+
+UNRESOLVED = '<unresolved>'
+
+ARCHIVE = 'archive.json'
+
+
+def metrics_dir():
+    return Path(settings.METRICS_DIR)
+
+
+def worker_path(pid):
+    return metrics_dir() / f'{pid}.json'
+
+
+def write_snapshot(path, snapshot):
+    # Write-then-rename, so readers never see half a file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(snapshot, fh)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def locked(shared):
+    """Keep scrapes from reading a worker's counts both in and out of the archive."""
+    if fcntl is None:
+        yield
+        return
+
+    directory = metrics_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / '.lock', 'a') as fh:
+        fcntl.flock(fh, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+# ================= REGISTRY =================
+
+class Registry:
+    """Counters and histograms keyed by ``(name, labels)``; thread-safe."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = defaultdict(float)
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            self.values[(name, labels)] += amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        with self.lock:
+            histogram = self.histograms.setdefault((name, labels), [0] * (len(buckets) + 1) + [0.0])
+            # Per-bucket counts; made cumulative when exported
+            histogram[bisect_left(buckets, value)] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'values': [[name, list(labels), value] for (name, labels), value in self.values.items()],
+                'histograms': [
+                    [name, list(labels), list(histogram)]
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def flush(self, force=False):
+        """Write this process's snapshot for ``/metrics`` to merge."""
+        now = time.monotonic()
+        if not force and now - self.last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.last_flush = now
+
+        write_snapshot(worker_path(os.getpid()), self.snapshot())
+
+
+registry = Registry()
+
+
+@atexit.register
+def flush_on_exit():
+    # The last few seconds of counts, for child_exit to archive
+    if registry.values or registry.histograms:
+        registry.flush(force=True)
+
+
+# ================= MERGING =================
+
+def read_snapshot(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None  # gone meanwhile or a stray file
+
+
+def add_snapshot(values, histograms, snapshot):
+    for name, labels, value in snapshot['values']:
+        values[(name, tuple(map(tuple, labels)))] += value
+    for name, labels, histogram in snapshot['histograms']:
+        merged = histograms.setdefault((name, tuple(map(tuple, labels))), [0] * len(histogram))
+        for i, count in enumerate(histogram):
+            merged[i] += count
+
+
+def merged_snapshots():
+    """Sum the snapshots of every worker that has written one, and the archive."""
+    values = defaultdict(float)
+    histograms = {}
+
+    with locked(shared=True):
+        for path in metrics_dir().glob('*.json'):
+            snapshot = read_snapshot(path)
+            if snapshot is not None:
+                add_snapshot(values, histograms, snapshot)
+
+    return values, histograms
+
+
+def mark_process_dead(pid):
+    """Fold the snapshot of worker ``pid``, which has exited, into the archive."""
+    path = worker_path(pid)
+    archive = metrics_dir() / ARCHIVE
+
+    with locked(shared=False):
+        snapshot = read_snapshot(path)
+        if snapshot is not None:
+            values, histograms = defaultdict(float), {}
+            for source in (read_snapshot(archive), snapshot):
+                if source is not None:
+                    add_snapshot(values, histograms, source)
+
+            write_snapshot(archive, {
+                'values': [[name, [list(pair) for pair in labels], value] for (name, labels), value in values.items()],
+                'histograms': [
+                    [name, [list(pair) for pair in labels], histogram]
+                    for (name, labels), histogram in histograms.items()
+                ],
+            })
+        path.unlink(missing_ok=True)
+
+
+def archive_workers():
+    """Archive every worker file; for server start, when none can be running."""
+    for path in metrics_dir().glob('*.json'):
+        if path.stem.isdigit():
+            mark_process_dead(int(path.stem))
+
+
+# ================= EXPOSITION =================
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def exposition():
+    """All workers' metrics in the Prometheus text format."""
+    registry.flush(force=True)
+    values, histograms = merged_snapshots()
+    lines = []
+
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+        if kind == 'counter':
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f'{name}{format_labels(labels)} {value:g}')
+            continue
+
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), histogram[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(labels, [("le", bound)])} {cumulative:g}')
+            lines.append(f'{name}_sum{format_labels(labels)} {histogram[-1]:g}')
+            lines.append(f'{name}_count{format_labels(labels)} {cumulative:g}')
+
+    return '\n'.join(lines) + '\n'
+
+
+# ================= TIMING =================
+
+class RequestTimings:
+    def __init__(self):
+        self.db = 0.0
+        self.queries = 0
+        self.templates = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = current_timings.get()
+        if timings is None:
+            return super().render(context, request)
+
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.templates += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time charged to the request."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        # Reuses the parent's TemplateDoesNotExist translation
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+
+        try:
+            with wrapped_connections(timings):
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+
+        elapsed = time.perf_counter() - start
+        self.record(request, response, timings, elapsed)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"',
+            f'tpl;dur={timings.templates * 1000:.1f}',
+            f'total;dur={elapsed * 1000:.1f}',
+        ])
+        return response
+
+    def record(self, request, response, timings, elapsed):
+        match = request.resolver_match
+        view = (('view', match.view_name if match else UNRESOLVED),)
+
+        registry.inc(
+            'krex_requests_total',
+            view + (('method', request.method), ('status', str(response.status_code))),
+        )
+        registry.observe('krex_request_duration_seconds', view, elapsed)
+        registry.observe('krex_db_duration_seconds', view, timings.db)
+        registry.inc('krex_db_queries_total', view, timings.queries)
+        registry.observe('krex_template_render_seconds', view, timings.templates)
+
+        size = response_size(response)
+        if size is not None:
+            registry.observe('krex_response_size_bytes', view, size)
+
+        registry.flush()
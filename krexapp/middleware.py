@@ -0,0 +1,92 @@
+"""
+Per-request query instrumentation.
+
+``QueryInspectorMiddleware`` records every SQL statement a request runs
+and logs a warning naming the view when one query shape repeats (the
+N+1 pattern: a query per row of a list) or the total goes over budget.
+``tests.py`` uses the same recorder to hold each URL to a fixed budget.
+"""
+
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Bind values are already placeholders; these vary between otherwise
+# identical queries too
+IN_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+NUMBER_RE = re.compile(r'\b\d+\b')
+
+
+# ================= RECORDING =================
+
+def query_shape(sql):
+    return NUMBER_RE.sub('N', IN_LIST_RE.sub('(...)', sql))
+
+
+def repeated_shapes(statements, threshold):
+    """``{shape: count}`` for every query shape run ``threshold`` or more times."""
+    counts = Counter(query_shape(sql) for sql in statements)
+    return {shape: count for shape, count in counts.items() if count >= threshold}
+
+
+@contextmanager
+def wrapped_connections(wrapper):
+    """Install ``wrapper`` on every connection of this thread for the block."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+@contextmanager
+def recorded_statements():
+    """Collect the SQL of every statement run on any connection in the block."""
+    statements = []
+
+    def record(execute, sql, params, many, context):
+        statements.append(sql)
+        return execute(sql, params, many, context)
+
+    with wrapped_connections(record):
+        yield statements
+
+
+# ================= MIDDLEWARE =================
+
+class QueryInspectorMiddleware:
+    """Enabled by ``QUERY_INSPECTOR``; thresholds come from settings too."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTOR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with recorded_statements() as statements:
+            response = self.get_response(request)
+
+        self.report(request, statements)
+        response['X-Query-Count'] = str(len(statements))
+        return response
+
+    def report(self, request, statements):
+        match = request.resolver_match
+        view = match.view_name if match else request.path
+
+        for shape, count in repeated_shapes(
+            statements, settings.QUERY_INSPECTOR_REPEAT_THRESHOLD
+        ).items():
+            logger.warning('Possible N+1 in %s: %d x %s', view, count, shape[:500])
+
+        if len(statements) > settings.QUERY_INSPECTOR_BUDGET:
+            logger.warning(
+                '%s ran %d queries (budget %d)',
+                view, len(statements), settings.QUERY_INSPECTOR_BUDGET
+            )
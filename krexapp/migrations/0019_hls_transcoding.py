@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('krexapp', '0018_alter_movie_options_alter_tvshows_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='video_hls',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='video_hls_status',
+            field=models.CharField(blank=True, choices=[('', 'Not transcoded'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='trailer_hls',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='trailer_hls_status',
+            field=models.CharField(blank=True, choices=[('', 'Not transcoded'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='video_hls',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='video_hls_status',
+            field=models.CharField(blank=True, choices=[('', 'Not transcoded'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], editable=False, max_length=12),
+        ),
+    ]
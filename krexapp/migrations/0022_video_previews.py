@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('krexapp', '0021_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='previews_vtt',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='previews_vtt',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
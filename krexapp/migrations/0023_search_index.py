@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('krexapp', '0022_video_previews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('movie', 'Movie'), ('show', 'TV Show'), ('episode', 'Episode')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('image', models.CharField(blank=True, max_length=255)),
+                ('boost', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='krexapp.searchdocument')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'document'), name='unique_search_term')],
+            },
+        ),
+    ]
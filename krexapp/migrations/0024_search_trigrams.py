@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('krexapp', '0023_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('term', models.CharField(max_length=64)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('gram', 'term'), name='unique_search_trigram')],
+            },
+        ),
+    ]
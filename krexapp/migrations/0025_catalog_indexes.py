@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('krexapp', '0024_search_trigrams'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-created_at', '-id'], name='movie_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_trending', True)), fields=['-created_at', '-id'], name='movie_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_hindi', True)), fields=['-created_at', '-id'], name='movie_hindi_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_english', True)), fields=['-created_at', '-id'], name='movie_english_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('top_rank__isnull', False)), fields=['top_rank'], name='movie_top_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshows',
+            index=models.Index(fields=['-created_at', '-id'], name='tvshow_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshows',
+            index=models.Index(condition=models.Q(('is_trending', True)), fields=['-created_at', '-id'], name='tvshow_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshows',
+            index=models.Index(condition=models.Q(('is_hindi', True)), fields=['-created_at', '-id'], name='tvshow_hindi_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshows',
+            index=models.Index(condition=models.Q(('is_english', True)), fields=['-created_at', '-id'], name='tvshow_english_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshows',
+            index=models.Index(condition=models.Q(('top_rank__isnull', False)), fields=['top_rank'], name='tvshow_top_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchlist',
+            index=models.Index(fields=['user', '-added_on'], name='watchlist_user_added_idx'),
+        ),
+    ]
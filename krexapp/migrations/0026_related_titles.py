@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('krexapp', '0025_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedTitles',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('catalog', models.CharField(choices=[('movies', 'Movies'), ('shows', 'TV Shows')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('related_ids', models.JSONField(default=list)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('catalog', 'object_id'), name='unique_related_titles')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('krexapp', '0026_related_titles'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.FloatField()),
+                ('duration', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField()),
+                ('episode', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='krexapp.episode')),
+                ('movie', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='krexapp.movie')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-updated_at'], name='progress_user_updated_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'movie'), name='unique_progress_movie'), models.UniqueConstraint(fields=('user', 'episode'), name='unique_progress_episode')],
+            },
+        ),
+    ]
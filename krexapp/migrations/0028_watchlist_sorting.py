@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_title_fields(apps, schema_editor):
+    Watchlist = apps.get_model('krexapp', 'Watchlist')
+
+    for field, model in (('movie', 'Movie'), ('tvshow', 'TvShows')):
+        titles = apps.get_model('krexapp', model).objects.filter(pk=OuterRef(f'{field}_id'))
+        Watchlist.objects.filter(**{f'{field}__isnull': False}).update(
+            language=Subquery(titles.values('language')),
+            release_year=Subquery(titles.values('release_year')),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('krexapp', '0027_watch_progress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='watchlist',
+            name='watchlist_user_added_idx',
+        ),
+        migrations.AddField(
+            model_name='watchlist',
+            name='language',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='watchlist',
+            name='release_year',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(copy_title_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='watchlist',
+            index=models.Index(fields=['user', '-added_on', '-id'], name='watchlist_user_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchlist',
+            index=models.Index(fields=['user', 'language', '-added_on', '-id'], name='watchlist_user_language_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchlist',
+            index=models.Index(fields=['user', '-release_year', '-added_on', '-id'], name='watchlist_user_year_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:14
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def start_from_created_at(apps, schema_editor):
+    # Episodes have no created_at and keep the time of this migration
+    for model in ('Movie', 'TvShows'):
+        apps.get_model('krexapp', model).objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('krexapp', '0028_watchlist_sorting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='tvshows',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(start_from_created_at, migrations.RunPython.noop),
+    ]
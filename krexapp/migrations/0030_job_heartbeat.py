@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:24
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def start_from_claim(apps, schema_editor):
+    # Jobs running now count as alive since their claim, as before
+    apps.get_model('krexapp', 'Job').objects.filter(status='running').update(heartbeat_at=F('locked_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('krexapp', '0029_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(start_from_claim, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,41 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
+# ================= TRANSCODING =================
+
+class TranscodeStatus(models.TextChoices):
+    NONE = '', 'Not transcoded'
+    PENDING = 'pending', 'Pending'
+    PROCESSING = 'processing', 'Processing'
+    READY = 'ready', 'Ready'
+    FAILED = 'failed', 'Failed'
+
+
+# ================= CATALOG INDEXES =================
+
+def catalog_indexes(prefix):
+    """
+    Indexes behind the browse rails and "newest" lists of a catalog model.
+    The rail ones are partial, so each holds only its own rows.
+    """
+    newest = ['-created_at', '-id']
+    return [
+        models.Index(fields=newest, name=f'{prefix}_created_idx'),
+        models.Index(fields=newest, condition=models.Q(is_trending=True), name=f'{prefix}_trending_idx'),
+        models.Index(fields=newest, condition=models.Q(is_hindi=True), name=f'{prefix}_hindi_idx'),
+        models.Index(fields=newest, condition=models.Q(is_english=True), name=f'{prefix}_english_idx'),
+        models.Index(
+            fields=['top_rank'],
+            condition=models.Q(top_rank__isnull=False),
+            name=f'{prefix}_top_rank_idx'
+        ),
+    ]
+
+
 # ================= MOVIE =================
 
 class Movie(models.Model):
@@ -13,6 +47,23 @@ class Movie(models.Model):
     video = models.FileField(upload_to='videos/', null=True, blank=True)
     trailer = models.FileField(upload_to='trailers/', null=True, blank=True)
 
+    # HLS ladders built by transcoding.py (paths relative to MEDIA_ROOT/hls)
+    video_hls = models.CharField(max_length=255, blank=True, editable=False)
+    video_hls_status = models.CharField(
+        max_length=12, choices=TranscodeStatus.choices, blank=True, editable=False
+    )
+    trailer_hls = models.CharField(max_length=255, blank=True, editable=False)
+    trailer_hls_status = models.CharField(
+        max_length=12, choices=TranscodeStatus.choices, blank=True, editable=False
+    )
+
+    # Filled in by the post-upload jobs in tasks.py
+    video_checksum = models.CharField(max_length=64, blank=True, editable=False)
+    duration = models.FloatField(null=True, blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    previews_vtt = models.CharField(max_length=255, blank=True, editable=False)
+
     release_year = models.IntegerField()
     language = models.CharField(max_length=50)
 
@@ -26,9 +77,11 @@ class Movie(models.Model):
     more_info_link = models.URLField(blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = catalog_indexes('movie')
 
     def __str__(self):
         return self.title
@@ -58,9 +111,11 @@ class TvShows(models.Model):
     more_info_link = models.URLField(blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = catalog_indexes('tvshow')
 
     def __str__(self):
         return self.title
@@ -82,8 +137,22 @@ class Episode(models.Model):
     description = models.TextField()
 
     video = models.FileField(upload_to='episodes/')
+    video_hls = models.CharField(max_length=255, blank=True, editable=False)
+    video_hls_status = models.CharField(
+        max_length=12, choices=TranscodeStatus.choices, blank=True, editable=False
+    )
+
+    # Filled in by the post-upload jobs in tasks.py
+    video_checksum = models.CharField(max_length=64, blank=True, editable=False)
+    duration = models.FloatField(null=True, blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    previews_vtt = models.CharField(max_length=255, blank=True, editable=False)
+
     thumbnail = models.ImageField(upload_to='episode_thumbnails/', null=True, blank=True)
 
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         ordering = ['season', 'episode_number']
         unique_together = ('tvshow', 'season', 'episode_number')  # 🔥 Prevent duplicate episodes
@@ -100,6 +169,11 @@ class Watchlist(models.Model):
     tvshow = models.ForeignKey(TvShows, on_delete=models.CASCADE, null=True, blank=True)
     added_on = models.DateTimeField(auto_now_add=True)
 
+    # Copied from the title so the watchlist page sorts and filters on
+    # indexes; see watchlists.py
+    language = models.CharField(max_length=50, blank=True, editable=False)
+    release_year = models.IntegerField(default=0, editable=False)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -111,9 +185,192 @@ class Watchlist(models.Model):
                 name='unique_user_tvshow'
             ),
         ]
+        indexes = [
+            models.Index(fields=['user', '-added_on', '-id'], name='watchlist_user_added_idx'),
+            models.Index(fields=['user', 'language', '-added_on', '-id'], name='watchlist_user_language_idx'),
+            models.Index(fields=['user', '-release_year', '-added_on', '-id'], name='watchlist_user_year_idx'),
+        ]
 
     def __str__(self):
         if self.movie:
             return f"{self.user.username} - {self.movie.title}"
         if self.tvshow:
-            return f"{self.user.username} - {self.tvshow.title}"
\ No newline at end of file
+            return f"{self.user.username} - {self.tvshow.title}"
+
+
+# ================= BACKGROUND JOBS =================
+
+class JobStatus(models.TextChoices):
+    QUEUED = 'queued', 'Queued'
+    RUNNING = 'running', 'Running'
+    DONE = 'done', 'Done'
+    FAILED = 'failed', 'Failed'
+
+
+class Job(models.Model):
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker while the task runs; see jobs.py
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+# ================= CHUNKED UPLOADS =================
+
+class ChunkedUpload(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    completed = models.BooleanField(default=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
+# ================= SEARCH INDEX =================
+
+class SearchDocument(models.Model):
+    KIND_CHOICES = [
+        ('movie', 'Movie'),
+        ('show', 'TV Show'),
+        ('episode', 'Episode'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+
+    # Enough to render a result without touching the catalog tables
+    title = models.CharField(max_length=255)
+    image = models.CharField(max_length=255, blank=True)
+    boost = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique_search_document'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.title}"
+
+
+class SearchTerm(models.Model):
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(
+        SearchDocument,
+        on_delete=models.CASCADE,
+        related_name='terms'
+    )
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'document'],
+                name='unique_search_term'
+            ),
+        ]
+
+
+class SearchTrigram(models.Model):
+    # Trigrams of every indexed term, for typo-tolerant lookups
+    gram = models.CharField(max_length=3)
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['gram', 'term'],
+                name='unique_search_trigram'
+            ),
+        ]
+
+
+# ================= RECOMMENDATIONS =================
+
+class RelatedTitles(models.Model):
+    # Precomputed by `manage.py build_recommendations`; see recommendations.py
+    CATALOG_CHOICES = [
+        ('movies', 'Movies'),
+        ('shows', 'TV Shows'),
+    ]
+
+    catalog = models.CharField(max_length=10, choices=CATALOG_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    # Most similar first
+    related_ids = models.JSONField(default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['catalog', 'object_id'],
+                name='unique_related_titles'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.catalog}: {self.object_id}"
+
+
+# ================= WATCH PROGRESS =================
+
+class WatchProgress(models.Model):
+    # Written in batches from player heartbeats; see progress.py
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, null=True, blank=True)
+    episode = models.ForeignKey(Episode, on_delete=models.CASCADE, null=True, blank=True)
+
+    position = models.FloatField()  # seconds
+    duration = models.FloatField(null=True, blank=True)
+    # When the heartbeat arrived, not when it was flushed
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'movie'],
+                name='unique_progress_movie'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'episode'],
+                name='unique_progress_episode'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-updated_at'], name='progress_user_updated_idx'),
+        ]
+
+    def __str__(self):
+        item = self.movie or self.episode
+        return f"{self.user.username} - {item} @ {self.position:.0f}s"
@@ -0,0 +1,235 @@
+"""
+Rendered catalog pages and fragments, shared between visitors.
+
+Catalog pages look the same to every anonymous visitor, so views wrapped
+in ``cache_for_anonymous`` answer requests without a session from a
+stored copy of the whole response. Signed-in users get their page
+rendered, but its shared parts (navbar, rails, episode lists) come from
+``{% cache %}`` fragments; per-user bits such as the watchlist button,
+the saved badges and the admin link are rendered outside them or vary
+their key.
+
+Pages and episode fragments are keyed by one catalog version, which
+signals.py bumps whenever a movie, show or episode is saved or deleted,
+``update()`` when a background task writes a field the pages show, and
+``recommendations.build`` with new related titles. An edit retires
+every cached page at once; nothing is deleted one by one.
+
+A page is stored under its path alone. Requests whose query string
+holds anything but tracking parameters are rendered instead, so made-up
+URLs can't fill the cache with copies of one page.
+
+Versions are the time of the last change, in nanoseconds, so they also
+give ``conditional`` views their ETag and Last-Modified: a revalidating
+browser or fronting cache gets a 304 for the price of one cache lookup,
+plus the session for signed-in users, whose pages also carry a version
+of their own watchlist and watch progress. Detail pages add the
+``updated_at`` of the title or episode they show, cached per version.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import rails
+
+# Old versions are never read again; this only bounds how long they linger
+TIMEOUT = 60 * 60
+
+VERSION_KEY = 'pages:version'
+
+# Everything the cached pages render that a background task writes; the
+# rest (transcode status, checksum, probe metadata) is bookkeeping
+PAGE_FIELDS = rails.RAIL_FIELDS + ('video_hls', 'trailer_hls', 'previews_vtt', 'thumbnail')
+MESSAGES_COOKIE = 'messages'
+
+# Added to shared links; they never change a page
+IGNORED_PARAMS = frozenset({
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'fbclid', 'gclid',
+})
+
+
+# ================= VERSIONS =================
+
+def user_version_key(user_id):
+    return f'pages:user:{user_id}:version'
+
+
+def version():
+    # Seeded from the clock, like rails.version()
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def bump(key, modified=None):
+    """Move ``key`` to the time of a change, ``modified`` or now."""
+    changed = int(modified.timestamp() * 1e9) if modified else time.time_ns()
+    # Never back: another worker's clock, or an edit saved out of order
+    cache.set(key, max(changed, (cache.get(key) or 0) + 1), None)
+
+
+def invalidate(modified=None):
+    # After commit, so a concurrent render can't cache the old rows
+    # under the new version
+    transaction.on_commit(lambda: bump(VERSION_KEY, modified))
+
+
+def touch_user(user_id):
+    """Mark the signed-in parts of ``user_id``'s pages as changed."""
+    bump(user_version_key(user_id))
+
+
+def update(rows, **values):
+    """
+    ``rows.update(**values)`` for background writes of ``PAGE_FIELDS``,
+    which send no save signals: stamps ``updated_at`` and invalidates
+    pages, and rails when it writes a field they show. Bookkeeping writes
+    are plain updates.
+    """
+    if not set(values).intersection(PAGE_FIELDS):
+        return rows.update(**values)
+
+    modified = timezone.now()
+    updated = rows.update(updated_at=modified, **values)
+    if updated:
+        invalidate(modified)
+        catalog = rails.catalog_of(rows.model)
+        if catalog and set(values).intersection(rails.RAIL_FIELDS):
+            rails.invalidate(catalog)
+    return updated
+
+
+# ================= ANONYMOUS PAGES =================
+
+def is_cacheable(request):
+    # Without a session there is no user and nothing flashed to show, so
+    # the page is the one every other anonymous visitor gets
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and MESSAGES_COOKIE not in request.COOKIES
+        and IGNORED_PARAMS.issuperset(request.GET)
+    )
+
+
+def page_key(request):
+    path = hashlib.md5(request.path.encode(), usedforsecurity=False).hexdigest()
+    return f'pages:{version()}:{path}'
+
+
+def should_store(request, response):
+    return (
+        request.method == 'GET'
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # A page holding a CSRF token needs the cookie set with it
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def cache_for_anonymous(view):
+    """Answer anonymous requests for ``view`` from a cached response."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_cacheable(request):
+            return view(request, *args, **kwargs)
+
+        key = page_key(request)
+        response = cache.get(key)
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if should_store(request, response):
+                cache.set(key, response, TIMEOUT)
+        return response
+
+    return wrapper
+
+
+# ================= CONDITIONAL REQUESTS =================
+
+def object_key(model, pk, catalog_version):
+    return f'pages:{model._meta.label_lower}:{pk}:{catalog_version}'
+
+
+def object_modified(model, pk, catalog_version):
+    """When ``model`` ``pk`` was last saved, in nanoseconds; looked up once per catalog version."""
+    key = object_key(model, pk, catalog_version)
+    modified = cache.get(key)
+    if modified is None:
+        updated_at = model.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return 0  # a 404, not worth an entry
+        modified = int(updated_at.timestamp() * 1e9)
+        cache.set(key, modified, TIMEOUT)
+    return modified
+
+
+def validators(request, per_user, resource, shown=None):
+    """``(etag, last_modified)`` for the page ``request`` asks for."""
+    keys = [VERSION_KEY]
+    user = ''
+    if per_user and settings.SESSION_COOKIE_NAME in request.COOKIES:
+        # The session, not the user, so a new login (and CSRF token)
+        # never matches a page from before it
+        user = request.COOKIES[settings.SESSION_COOKIE_NAME]
+        user_id = request.session.get(SESSION_KEY)
+        if user_id is not None:
+            keys.append(user_version_key(user_id))
+
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = cache.get_or_set(key, time.time_ns, None)
+
+    stamps = [versions[key] for key in keys]
+    if shown is not None:
+        stamps.append(object_modified(*shown, versions[VERSION_KEY]))
+
+    validator = '|'.join([resource(request), user, *map(str, stamps)])
+    # Weak: a page may differ byte for byte between renders (CSRF masking)
+    etag = 'W/' + quote_etag(hashlib.md5(validator.encode(), usedforsecurity=False).hexdigest())
+    return etag, max(stamps) // 10 ** 9
+
+
+def full_path(request):
+    return request.get_full_path()
+
+
+def conditional(per_user=True, resource=full_path, model=None):
+    """
+    Answer ``If-None-Match`` / ``If-Modified-Since`` from the versions
+    alone, before ``view`` queries or renders anything. ``per_user=False``
+    is for responses that are the same for everyone; ``resource(request)``
+    names what was asked for, when equivalent URLs should share an ETag.
+    Detail views pass the ``model`` of their ``id`` so its ``updated_at``
+    is part of the validators too.
+    """
+
+    def finish(request, response, etag, last_modified):
+        if request.method in ('GET', 'HEAD') and response.status_code == 200:
+            response.headers.setdefault('ETag', etag)
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+        return response
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            shown = (model, kwargs['id']) if model is not None else None
+            etag, last_modified = validators(request, per_user, resource, shown)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return finish(request, response, etag, last_modified)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,106 @@
+"""
+Keyset (cursor) pagination.
+
+A page is "the next ``size`` rows after this sort key", expressed as a
+WHERE clause on the ordering columns instead of an OFFSET, so every page
+costs the same index range scan however deep the client has scrolled,
+and rows added meanwhile never shift or repeat items.
+
+Cursors are opaque to clients: URL-safe base64 of the last row's
+ordering values.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_SIZE = 20
+MAX_SIZE = 60
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_ordering(ordering):
+    """``('-created_at', '-id')`` -> ``[('created_at', True), ('id', True)]``."""
+    return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+
+# ================= CURSORS =================
+
+def encode_cursor(instance, ordering):
+    values = [
+        instance._meta.get_field(field).value_to_string(instance)
+        for field, descending in parse_ordering(ordering)
+    ]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    fields = parse_ordering(ordering)
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Malformed cursor')
+
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor('Cursor does not match this ordering')
+
+    try:
+        return [
+            model._meta.get_field(field).to_python(value)
+            for (field, descending), value in zip(fields, values)
+        ]
+    except ValidationError:
+        raise InvalidCursor('Cursor does not match this ordering')
+
+
+def after(ordering, values):
+    """
+    Rows strictly after ``values`` in ``ordering``, as the expanded row
+    comparison ``(a > x) OR (a = x AND b > y) OR ...``.
+
+    The OR alone can't seek a composite index, so it is ANDed with the
+    redundant ``a >= x``, which gives the planner a range to start from.
+    """
+    fields = parse_ordering(ordering)
+    condition = Q()
+    equal = Q()
+
+    for (field, descending), value in zip(fields, values):
+        lookup = 'lt' if descending else 'gt'
+        condition |= equal & Q(**{f'{field}__{lookup}': value})
+        equal &= Q(**{field: value})
+
+    (first, descending), start = fields[0], values[0]
+    return Q(**{f'{first}__{"lte" if descending else "gte"}': start}) & condition
+
+
+# ================= PAGES =================
+
+def paginate(queryset, ordering, cursor=None, size=DEFAULT_SIZE):
+    """
+    Return ``(rows, next_cursor)`` for the page after ``cursor`` (the
+    first page if it is empty). ``next_cursor`` is None on the last page.
+    ``ordering`` must end in a unique field so the sort key is total.
+    """
+    size = max(1, min(int(size), MAX_SIZE))
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        queryset = queryset.filter(after(ordering, decode_cursor(cursor, queryset.model, ordering)))
+
+    # One extra row tells us whether there is a next page
+    rows = list(queryset[:size + 1])
+    if len(rows) <= size:
+        return rows, None
+
+    rows = rows[:size]
+    return rows, encode_cursor(rows[-1], ordering)
@@ -0,0 +1,193 @@
+"""
+Frame extraction with OpenCV: representative thumbnails and seek-preview
+sprite sheets with a WebVTT index.
+
+Everything here works on plain file paths and has no Django imports, so
+``generate_previews`` can fan it out to a process pool.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+TILE_WIDTH = 160
+TILE_HEIGHT = 90
+SHEET_COLUMNS = 10
+SHEET_ROWS = 10
+
+SPRITE_INTERVAL = 10  # seconds between preview tiles
+MAX_TILES = 600
+
+THUMBNAIL_CANDIDATES = 24
+THUMBNAIL_WINDOW = (0.1, 0.8)  # skip cold opens and end credits
+THUMBNAIL_WIDTH = 1280
+
+VTT_NAME = 'previews.vtt'
+
+
+class FrameError(Exception):
+    pass
+
+
+# ================= READING =================
+
+def open_video(path):
+    capture = cv2.VideoCapture(str(path))
+    if not capture.isOpened():
+        raise FrameError(f'Cannot open {path}')
+    return capture
+
+
+def video_duration(capture):
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0
+    frames = capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+    if fps <= 0 or frames <= 0:
+        raise FrameError('Unknown duration')
+    return frames / fps
+
+
+def read_at(capture, seconds):
+    capture.set(cv2.CAP_PROP_POS_MSEC, seconds * 1000)
+    ok, frame = capture.read()
+    return frame if ok else None
+
+
+# ================= THUMBNAILS =================
+
+def frame_score(frame):
+    """
+    Higher is more representative. Near-black/near-white frames (fades,
+    title cards) score zero; otherwise sharpness times contrast.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    brightness = float(gray.mean())
+
+    if brightness < 25 or brightness > 230:
+        return 0.0
+
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    contrast = float(gray.std())
+    return sharpness * contrast
+
+
+def pick_thumbnail(path, dest):
+    """Write the best of ``THUMBNAIL_CANDIDATES`` sampled frames to ``dest``."""
+    capture = open_video(path)
+    try:
+        duration = video_duration(capture)
+        start, end = THUMBNAIL_WINDOW
+
+        best, best_score = None, -1.0
+        for seconds in np.linspace(duration * start, duration * end, THUMBNAIL_CANDIDATES):
+            frame = read_at(capture, seconds)
+            if frame is None:
+                continue
+            score = frame_score(frame)
+            if score > best_score:
+                best, best_score = frame, score
+    finally:
+        capture.release()
+
+    if best is None:
+        raise FrameError(f'No readable frames in {path}')
+
+    height, width = best.shape[:2]
+    if width > THUMBNAIL_WIDTH:
+        best = cv2.resize(
+            best,
+            (THUMBNAIL_WIDTH, round(height * THUMBNAIL_WIDTH / width)),
+            interpolation=cv2.INTER_AREA
+        )
+
+    write_image(dest, best)
+    return dest
+
+
+# ================= SPRITES =================
+
+def vtt_timestamp(seconds):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f'{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}'
+
+
+def build_sprites(path, out_dir):
+    """
+    Sample a tile every ``SPRITE_INTERVAL`` seconds (spread further apart
+    for very long videos), pack them into sheets and write the WebVTT
+    index that maps each time range to a ``#xywh`` region.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    capture = open_video(path)
+    try:
+        duration = video_duration(capture)
+        interval = max(SPRITE_INTERVAL, duration / MAX_TILES)
+        times = np.arange(0, duration, interval)
+
+        per_sheet = SHEET_COLUMNS * SHEET_ROWS
+        blank = np.zeros((TILE_HEIGHT, TILE_WIDTH, 3), dtype=np.uint8)
+        cues = ['WEBVTT', '']
+
+        for sheet_index, first in enumerate(range(0, len(times), per_sheet)):
+            chunk = times[first:first + per_sheet]
+            rows = -(-len(chunk) // SHEET_COLUMNS)
+            sheet = np.zeros((rows * TILE_HEIGHT, SHEET_COLUMNS * TILE_WIDTH, 3), dtype=np.uint8)
+            sheet_name = f'sprite_{sheet_index}.jpg'
+
+            for i, seconds in enumerate(chunk):
+                frame = read_at(capture, seconds)
+                tile = blank if frame is None else cv2.resize(
+                    frame, (TILE_WIDTH, TILE_HEIGHT), interpolation=cv2.INTER_AREA
+                )
+                x = (i % SHEET_COLUMNS) * TILE_WIDTH
+                y = (i // SHEET_COLUMNS) * TILE_HEIGHT
+                sheet[y:y + TILE_HEIGHT, x:x + TILE_WIDTH] = tile
+
+                end = min(seconds + interval, duration)
+                cues.append(f'{vtt_timestamp(seconds)} --> {vtt_timestamp(end)}')
+                cues.append(f'{sheet_name}#xywh={x},{y},{TILE_WIDTH},{TILE_HEIGHT}')
+                cues.append('')
+
+            write_image(out_dir / sheet_name, sheet)
+    finally:
+        capture.release()
+
+    vtt = out_dir / VTT_NAME
+    vtt.write_text('\n'.join(cues))
+    return vtt
+
+
+# ================= OUTPUT =================
+
+def write_image(dest, image):
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    if not ok:
+        raise FrameError(f'Could not encode {dest.name}')
+
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(encoded.tobytes())
+    os.replace(tmp, dest)
+
+
+def process_video(path, out_dir, thumbnail_dest=None):
+    """
+    Entry point for pool workers: build sprites (and optionally a
+    thumbnail) for one video. Returns the written paths as strings.
+    """
+    cv2.setNumThreads(1)  # one process per core is the parallelism
+
+    result = {'vtt': str(build_sprites(path, out_dir)), 'thumbnail': None}
+    if thumbnail_dest:
+        result['thumbnail'] = str(pick_thumbnail(path, thumbnail_dest))
+    return result
@@ -0,0 +1,114 @@
+"""
+Precomputed browse rails (trending, Hindi, English, top 10) for the
+movies and tv_shows pages. Pages render the first page of each rail and
+fetch the rest from the ``catalog_rail`` endpoint as the row scrolls.
+
+Each catalog's rails are read from the database once and kept in the
+default cache under a version number. Signals in signals.py bump the
+version when a row is added or deleted or a field the rails display
+changes, so browse pages run no catalog queries until an edit. The
+version is also the key of the rendered template fragments.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Movie, TvShows
+from .pagination import paginate
+
+# Old versions are never read again; this only bounds how long they linger
+TIMEOUT = 60 * 60 * 24
+
+TOP_SIZE = 10
+PAGE_SIZE = 20
+
+# Paginated rails; newest first, id breaking created_at ties
+RAILS = {
+    'trending': Q(is_trending=True),
+    'hindi': Q(is_hindi=True),
+    'english': Q(is_english=True),
+}
+ORDERING = ('-created_at', '-id')
+
+CATALOGS = {
+    'movies': Movie,
+    'shows': TvShows,
+}
+
+# What the rail templates read; saving any other field keeps them valid
+RAIL_FIELDS = (
+    'title', 'description', 'poster', 'banner',
+    'is_trending', 'is_hindi', 'is_english', 'top_rank',
+)
+
+
+def catalog_of(model):
+    return {model: name for name, model in CATALOGS.items()}.get(model)
+
+
+# ================= VERSIONS =================
+
+def version_key(catalog):
+    return f'rails:{catalog}:version'
+
+
+def version(catalog):
+    # Seeded from the clock so a version lost to eviction can't come back
+    # as a number whose fragments are still cached
+    return cache.get_or_set(version_key(catalog), time.time_ns, None)
+
+
+def invalidate(catalog):
+    def bump():
+        try:
+            cache.incr(version_key(catalog))
+        except ValueError:
+            cache.set(version_key(catalog), time.time_ns(), None)
+
+    # After commit, so a concurrent rebuild can't cache the old rows
+    # under the new version
+    transaction.on_commit(bump)
+
+
+def rails_changed(instance, previous):
+    """True if saving ``instance`` over ``previous`` values alters a rail."""
+    if previous is None:
+        return True
+    return any(
+        # get_prep_value reduces file fields to the stored name ('' if empty)
+        instance._meta.get_field(field).get_prep_value(getattr(instance, field)) != previous[field]
+        for field in RAIL_FIELDS
+    )
+
+
+# ================= RAILS =================
+
+def page(catalog, rail, cursor=None, size=PAGE_SIZE):
+    """One page of a rail as ``(rows, next_cursor)``."""
+    rows = CATALOGS[catalog].objects.filter(RAILS[rail])
+    return paginate(rows, ORDERING, cursor, size)
+
+
+def build(catalog):
+    """First page of every rail, plus the top list, as ``{rail: (rows, cursor)}``."""
+    built = {rail: page(catalog, rail) for rail in RAILS}
+
+    top = CATALOGS[catalog].objects.filter(top_rank__isnull=False).order_by('top_rank')
+    built['top'] = (list(top[:TOP_SIZE]), None)
+    return built
+
+
+def get(catalog):
+    """Return ``(version, rails)`` for ``catalog``, building them on a miss."""
+    current = version(catalog)
+    key = f'rails:{catalog}:pages:{current}'
+
+    rails = cache.get(key)
+    if rails is None:
+        rails = build(catalog)
+        cache.set(key, rails, TIMEOUT)
+
+    return current, rails
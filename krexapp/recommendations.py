@@ -0,0 +1,284 @@
+"""
+Related titles for the detail pages.
+
+``build(catalog)`` scores every pair of titles in a catalog on two
+signals and keeps each title's ``TOP_K`` best neighbours in
+``RelatedTitles``:
+
+- watchlist co-occurrence: how many users saved both, cosine-normalized
+  so popular titles don't neighbour everything;
+- content: TF-IDF of titles and descriptions (tokenized like search, and
+  randomly projected to ``TEXT_DIMENSIONS`` so memory stays linear in the
+  catalog), language, release year and the rail flags.
+
+Content features are stacked into one unit-weighted vector per title, so
+a block of rows times the whole matrix gives a block of similarities.
+Scores are computed ``BATCH`` rows at a time and never held as a full
+N x N matrix. ``manage.py build_recommendations`` runs it offline;
+``related()`` then costs one cache lookup per page.
+"""
+
+import math
+from collections import Counter
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from . import pagecache, rails, search
+from .models import RelatedTitles, Watchlist
+
+TOP_K = 20  # stored per title, so deleted ones can drop out
+RELATED_SIZE = 10  # shown per page
+BATCH = 256
+
+# Weights of each signal in the final score
+CO_OCCURRENCE_WEIGHT = 1.0
+TEXT_WEIGHT = 0.6
+LANGUAGE_WEIGHT = 0.25
+YEAR_WEIGHT = 0.15
+FLAGS_WEIGHT = 0.1
+
+TEXT_DIMENSIONS = 256
+MAX_VOCABULARY = 50_000
+TITLE_REPEAT = 2  # title words count this many times a description word
+PAIR_CHUNK = 5_000_000  # co-occurrence pairs counted at once
+
+CONTENT_FIELDS = (
+    'id', 'title', 'description', 'language', 'release_year',
+    'is_trending', 'is_hindi', 'is_english',
+)
+FLAGS = ('is_trending', 'is_hindi', 'is_english')
+
+WATCHLIST_FIELDS = {'movies': 'movie_id', 'shows': 'tvshow_id'}
+
+
+# ================= CONTENT =================
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def text_vectors(rows, dimensions=TEXT_DIMENSIONS, seed=0):
+    """TF-IDF vectors, randomly projected to ``dimensions`` (cosine-preserving)."""
+    vocabulary = {}
+    documents, terms, frequencies = [], [], []
+
+    for i, row in enumerate(rows):
+        counts = Counter(search.tokenize(row['description'], stopwords=True))
+        for term in search.tokenize(row['title'], stopwords=True):
+            counts[term] += TITLE_REPEAT
+        for term, count in counts.items():
+            documents.append(i)
+            terms.append(vocabulary.setdefault(term, len(vocabulary)))
+            frequencies.append(count)
+
+    vectors = np.zeros((len(rows), dimensions), dtype=np.float32)
+    if not terms:
+        return vectors
+
+    documents = np.array(documents)
+    terms = np.array(terms)
+    frequencies = np.array(frequencies, dtype=np.float32)
+
+    # A term in only one title can't make two titles alike
+    df = np.bincount(terms, minlength=len(vocabulary))
+    shared = np.flatnonzero(df > 1)
+    if len(shared) > MAX_VOCABULARY:
+        shared = shared[np.argsort(-df[shared], kind='stable')[:MAX_VOCABULARY]]
+    column = np.full(len(vocabulary), -1)
+    column[shared] = np.arange(len(shared))
+
+    keep = column[terms] >= 0
+    documents, terms, frequencies = documents[keep], terms[keep], frequencies[keep]
+    idf = np.log((1 + len(rows)) / (1 + df[terms])) + 1
+    weights = ((1 + np.log(frequencies)) * idf).astype(np.float32)
+
+    rng = np.random.default_rng(seed)
+    projection = rng.standard_normal((len(shared), dimensions), dtype=np.float32)
+
+    # Chunked so the per-term rows never all exist at once
+    step = max(1, PAIR_CHUNK // dimensions)
+    for start in range(0, len(terms), step):
+        chunk = slice(start, start + step)
+        np.add.at(
+            vectors, documents[chunk],
+            weights[chunk, None] * projection[column[terms[chunk]]]
+        )
+
+    return normalize_rows(vectors)
+
+
+def one_hot(values):
+    index = {value: i for i, value in enumerate(sorted(set(values)))}
+    matrix = np.zeros((len(values), len(index)), dtype=np.float32)
+    matrix[np.arange(len(values)), [index[value] for value in values]] = 1
+    return matrix
+
+
+def year_vectors(years):
+    """Unit vectors whose dot product falls from 1 (same year) to -1 (span apart)."""
+    years = np.array(years, dtype=np.float32)
+    span = max(float(years.max() - years.min()), 1.0)
+    angle = (years - years.min()) / span * math.pi
+    return np.stack([np.cos(angle), np.sin(angle)], axis=1)
+
+
+def content_vectors(rows):
+    blocks = [
+        (TEXT_WEIGHT, text_vectors(rows)),
+        (LANGUAGE_WEIGHT, one_hot([row['language'].strip().casefold() for row in rows])),
+        (YEAR_WEIGHT, year_vectors([row['release_year'] for row in rows])),
+        (FLAGS_WEIGHT, normalize_rows(np.array(
+            [[row[flag] for flag in FLAGS] for row in rows], dtype=np.float32
+        ))),
+    ]
+    # Each block is unit-length per row, so dot products sum weighted cosines
+    return np.hstack([math.sqrt(weight) * block for weight, block in blocks]).astype(np.float32)
+
+
+# ================= CO-OCCURRENCE =================
+
+def no_pairs():
+    empty = np.array([], dtype=np.int64)
+    return empty, empty, np.array([], dtype=np.float32)
+
+
+def co_occurrence(catalog, ids):
+    """
+    ``(a, b, score)`` arrays, sorted by ``a``, for every pair of title
+    indexes saved by the same user; score is count / sqrt(pop(a) * pop(b)).
+    """
+    field = WATCHLIST_FIELDS[catalog]
+    saved = np.array(
+        Watchlist.objects.filter(**{f'{field}__isnull': False}).values_list('user_id', field),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+    items = np.searchsorted(ids, saved[:, 1])
+    known = (items < len(ids)) & (ids[np.minimum(items, len(ids) - 1)] == saved[:, 1])
+    users, items = saved[known, 0], items[known]
+    if not len(items):
+        return no_pairs()
+
+    order = np.lexsort((items, users))
+    users, items = users[order], items[order]
+    popularity = np.bincount(items, minlength=len(ids))
+
+    # Each row pairs with every row of the same user, itself included
+    starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+    sizes = np.diff(np.r_[starts, len(users)])
+    row_sizes = np.repeat(sizes, sizes)
+    row_starts = np.repeat(starts, sizes)
+    ends = np.cumsum(row_sizes)
+
+    codes, counts = [], []
+    boundaries = np.searchsorted(ends, np.arange(PAIR_CHUNK, ends[-1], PAIR_CHUNK), side='right')
+    for lo, hi in zip(np.r_[0, boundaries], np.r_[boundaries, len(items)]):
+        if lo == hi:
+            continue
+        repeat = row_sizes[lo:hi]
+        left = np.repeat(np.arange(lo, hi), repeat)
+        offset = np.arange(len(left)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+        right = np.repeat(row_starts[lo:hi], repeat) + offset
+
+        pairs = left != right
+        chunk_codes, chunk_counts = np.unique(
+            items[left[pairs]] * len(ids) + items[right[pairs]], return_counts=True
+        )
+        codes.append(chunk_codes)
+        counts.append(chunk_counts)
+
+    if not codes:
+        return no_pairs()
+
+    codes, inverse = np.unique(np.concatenate(codes), return_inverse=True)
+    totals = np.bincount(inverse, weights=np.concatenate(counts))
+    a, b = np.divmod(codes, len(ids))
+    scores = totals / np.sqrt(popularity[a] * popularity[b])
+    return a, b, scores.astype(np.float32)
+
+
+# ================= NEIGHBOURS =================
+
+def top_neighbours(vectors, pairs, top_k=TOP_K, batch=BATCH):
+    """Index of each row's ``top_k`` most similar other rows, best first."""
+    count = len(vectors)
+    k = min(top_k, count - 1)
+    if k <= 0:
+        return np.empty((count, 0), dtype=np.int64)
+
+    a, b, scores = pairs
+    neighbours = np.empty((count, k), dtype=np.int64)
+
+    for lo in range(0, count, batch):
+        hi = min(lo + batch, count)
+        similarity = vectors[lo:hi] @ vectors.T
+
+        i, j = np.searchsorted(a, [lo, hi])
+        similarity[a[i:j] - lo, b[i:j]] += CO_OCCURRENCE_WEIGHT * scores[i:j]
+        similarity[np.arange(hi - lo), np.arange(lo, hi)] = -np.inf
+
+        best = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(similarity, best, axis=1), axis=1, kind='stable')
+        neighbours[lo:hi] = np.take_along_axis(best, order, axis=1)
+
+    return neighbours
+
+
+def build(catalog, top_k=TOP_K):
+    """Recompute and store ``catalog``'s related titles; returns the count."""
+    model = rails.CATALOGS[catalog]
+    rows = list(model.objects.order_by('id').values(*CONTENT_FIELDS))
+    ids = np.array([row['id'] for row in rows], dtype=np.int64)
+
+    neighbours = top_neighbours(content_vectors(rows), co_occurrence(catalog, ids), top_k) if rows else []
+
+    with transaction.atomic():
+        RelatedTitles.objects.filter(catalog=catalog).delete()
+        RelatedTitles.objects.bulk_create(
+            (
+                RelatedTitles(catalog=catalog, object_id=object_id, related_ids=ids[row].tolist())
+                for object_id, row in zip(ids.tolist(), neighbours)
+            ),
+            batch_size=1000,
+        )
+        # Drops the cached lists, along with the rails sharing the version,
+        # and the pages showing them
+        rails.invalidate(catalog)
+        pagecache.invalidate()
+
+    return len(rows)
+
+
+# ================= SERVING =================
+
+def related_key(catalog, object_id):
+    return f'related:{catalog}:{object_id}:{rails.version(catalog)}'
+
+
+def related(model, object_id, size=RELATED_SIZE):
+    """Titles related to ``object_id``, from the cache when possible."""
+    catalog = rails.catalog_of(model)
+    key = related_key(catalog, object_id)
+
+    titles = cache.get(key)
+    if titles is None:
+        titles = fetch_related(model, catalog, object_id, size)
+        cache.set(key, titles, rails.TIMEOUT)
+    return titles
+
+
+def fetch_related(model, catalog, object_id, size):
+    related_ids = (
+        RelatedTitles.objects.filter(catalog=catalog, object_id=object_id)
+        .values_list('related_ids', flat=True).first()
+    )
+
+    if not related_ids:
+        # Added since the last build: the newest titles, as before
+        return list(model.objects.exclude(id=object_id).order_by(*rails.ORDERING)[:size])
+
+    titles = model.objects.in_bulk(related_ids)
+    return [titles[i] for i in related_ids if i in titles][:size]
@@ -0,0 +1,144 @@
+"""
+Read-replica routing.
+
+Catalog reads made while serving a web request go to one of the
+``DATABASE_REPLICAS``; everything else, and any read inside a
+transaction, uses the primary. Management commands and the job worker
+never read from a replica: a job queued for a row that was just written
+must be able to see that row.
+
+Replicas lag. A request that writes pins its session to the primary for
+``DATABASE_REPLICA_PIN_SECONDS`` through a cookie, so the redirect after
+a watchlist toggle reads what was just written. A replica that fails its
+health check is skipped until it is checked again.
+
+Rails, related titles and pages are cached under versions that move when
+the catalog changes (see pagecache.py). A replica still behind would
+fill them with the old rows, kept under the new version until the next
+change, so every request reads from the primary for the same
+``DATABASE_REPLICA_PIN_SECONDS`` after a catalog change.
+"""
+
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from . import pagecache
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'krex_primary'
+HEALTH_CHECK_INTERVAL = 10  # seconds
+
+# Rows that only change through the admin and tolerate a little lag
+REPLICATED_MODELS = {
+    'krexapp.movie', 'krexapp.tvshows', 'krexapp.episode',
+    'krexapp.searchdocument', 'krexapp.searchterm', 'krexapp.searchtrigram',
+}
+
+
+class RequestRouting:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+# None outside of a request
+current_routing = ContextVar('current_routing', default=None)
+
+
+def may_lag(catalog_version):
+    """Whether a replica may not have the change made at ``catalog_version`` yet."""
+    return time.time_ns() - catalog_version < settings.DATABASE_REPLICA_PIN_SECONDS * 10 ** 9
+
+
+# ================= HEALTH =================
+
+# alias -> (healthy, monotonic time of the check), per process
+health = {}
+
+
+def is_healthy(alias):
+    healthy, checked_at = health.get(alias, (False, None))
+    now = time.monotonic()
+    if checked_at is not None and now - checked_at < HEALTH_CHECK_INTERVAL:
+        return healthy
+
+    connection = connections[alias]
+    try:
+        connection.ensure_connection()
+        healthy = connection.is_usable()
+    except DatabaseError:
+        healthy = False
+
+    if not healthy:
+        logger.warning('Replica %s is unavailable; reading from the primary', alias)
+        connection.close_if_unusable_or_obsolete()
+
+    health[alias] = (healthy, now)
+    return healthy
+
+
+# ================= ROUTER =================
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        if (
+            routing is None
+            or routing.pinned
+            or model._meta.label_lower not in REPLICATED_MODELS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+
+        replicas = [alias for alias in settings.DATABASE_REPLICAS if is_healthy(alias)]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        routing = current_routing.get()
+        if routing is not None:
+            # Later reads in this request, and the next few requests,
+            # must see this write
+            routing.pinned = routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+# ================= MIDDLEWARE =================
+
+class ReplicaPinningMiddleware:
+    """Scopes routing to the request and sets the pin cookie after writes."""
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = RequestRouting(pinned=PIN_COOKIE in request.COOKIES or may_lag(pagecache.version()))
+        token = current_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+
+        if routing.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,470 @@
+"""
+Inverted index over catalog titles, descriptions and languages.
+
+Terms are stored as search keys (see transliteration.py), so Devanagari
+and the usual Latin spellings of a Hindi word share one entry, and their
+trigrams are indexed too so misspelled words can be corrected without
+scanning the vocabulary.
+
+Every Movie, TvShows and Episode gets a ``SearchDocument`` carrying what a
+result needs to render, plus one ``SearchTerm`` row per distinct token.
+Lookups are index range scans on ``term`` (which is also how prefix
+matching works), so their cost depends on the number of matches rather
+than the size of the catalog. Signals in signals.py keep it current.
+"""
+
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from functools import lru_cache
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Max, Q, Sum, Value, When
+
+from . import pagecache
+from .models import Episode, Movie, SearchDocument, SearchTerm, SearchTrigram, TvShows
+from .transliteration import prefix_keys, search_key
+
+TITLE_WEIGHT = 3.0
+LANGUAGE_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 1.0
+EXACT_BONUS = 0.5
+TRENDING_BOOST = 0.5
+
+# Score multiplier for terms reached by typo correction, by edit distance
+FUZZY_FACTORS = {1: 0.6, 2: 0.35}
+FUZZY_CANDIDATES = 64
+
+MAX_TERM_LENGTH = 64
+MAX_DESCRIPTION_TERMS = 200
+
+# Range upper bound for prefix scans
+PREFIX_END = '\U0010ffff'
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has he her his in is it its of on or
+she that the their they this to was were will with who
+""".split())
+
+WORD_RE = re.compile(r'[\w\u0900-\u097f]+')
+
+
+# ================= TEXT =================
+
+@lru_cache(maxsize=65536)
+def normalize_word(word):
+    word = word.casefold()
+
+    # Fold accents on Latin text only; other scripts carry meaning in marks
+    decomposed = unicodedata.normalize('NFKD', word)
+    if all(ord(c) < 0x250 or unicodedata.combining(c) for c in decomposed):
+        word = ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+    return word[:MAX_TERM_LENGTH]
+
+
+def words(text, stopwords=False):
+    normalized = (normalize_word(w) for w in WORD_RE.findall(text or ''))
+    return [w for w in normalized if w and not (stopwords and w in STOPWORDS)]
+
+
+def tokenize(text, stopwords=False):
+    return [search_key(w)[:MAX_TERM_LENGTH] for w in words(text, stopwords)]
+
+
+def query_tokens(query):
+    """
+    The distinct search keys of ``query``, and ``{token: prefixes}`` of the
+    other keys its last word, which may still be being typed, is matched
+    on: "de" also matches what "dee" folds to (see prefix_keys).
+    """
+    typed = words(query)
+    if not typed:
+        return [], {}
+
+    tokens = list(dict.fromkeys(search_key(w)[:MAX_TERM_LENGTH] for w in typed))
+    last = search_key(typed[-1])[:MAX_TERM_LENGTH]
+    more = sorted({key[:MAX_TERM_LENGTH] for key in prefix_keys(typed[-1])} - {last})
+    return tokens, {last: more} if more else {}
+
+
+def trigrams(term):
+    padded = f'^{term}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance, giving up once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+
+    return previous[-1]
+
+
+def max_edits(token):
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+def weighted_terms(title, language='', description=''):
+    weights = Counter()
+
+    for word in tokenize(title):
+        weights[word] += TITLE_WEIGHT
+
+    for word in tokenize(language):
+        weights[word] += LANGUAGE_WEIGHT
+
+    counts = Counter(tokenize(description, stopwords=True))
+    for word, count in counts.most_common(MAX_DESCRIPTION_TERMS):
+        weights[word] += DESCRIPTION_WEIGHT * (1 + math.log(count))
+
+    return weights
+
+
+# ================= INDEXING =================
+
+def document_fields(instance):
+    """Return ``(kind, title, image, boost, terms)`` for a catalog object."""
+    if isinstance(instance, Movie):
+        kind, title, image = 'movie', instance.title, instance.poster
+        terms = weighted_terms(instance.title, instance.language, instance.description)
+    elif isinstance(instance, TvShows):
+        kind, title, image = 'show', instance.title, instance.poster
+        terms = weighted_terms(instance.title, instance.language, instance.description)
+    elif isinstance(instance, Episode):
+        show = instance.tvshow
+        kind = 'episode'
+        title = f"{show.title} S{instance.season:02d}E{instance.episode_number:02d} - {instance.title}"
+        image = instance.thumbnail or show.poster
+        terms = weighted_terms(instance.title, show.language, instance.description)
+        # Episodes are found by their show's name too, but rank below it
+        for word in tokenize(show.title):
+            terms[word] += LANGUAGE_WEIGHT
+    else:
+        raise TypeError(f'{type(instance).__name__} is not searchable')
+
+    boost = TRENDING_BOOST if getattr(instance, 'is_trending', False) else 0
+    return kind, title, image.name if image else '', boost, terms
+
+
+def kind_of(instance):
+    return {Movie: 'movie', TvShows: 'show', Episode: 'episode'}[type(instance)]
+
+
+def write_document(instance):
+    """Store ``instance``'s document and terms; returns the terms."""
+    kind, title, image, boost, terms = document_fields(instance)
+
+    document, created = SearchDocument.objects.update_or_create(
+        kind=kind,
+        object_id=instance.pk,
+        defaults={'title': title[:255], 'image': image, 'boost': boost},
+    )
+
+    previous = set()
+    if not created:
+        previous = set(document.terms.values_list('term', flat=True))
+        document.terms.all().delete()
+
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term, document=document, weight=weight)
+        for term, weight in terms.items()
+    )
+    prune_trigrams(previous - set(terms))
+    return terms
+
+
+def add_trigrams(terms):
+    SearchTrigram.objects.bulk_create(
+        (
+            SearchTrigram(gram=gram, term=term)
+            for term in terms
+            if len(term) >= 3
+            for gram in trigrams(term)
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def prune_trigrams(terms):
+    """Drop the trigrams of those ``terms`` no document uses any more."""
+    used = set(SearchTerm.objects.filter(term__in=terms).values_list('term', flat=True).distinct())
+    orphans = set(terms) - used
+    if orphans:
+        # By (gram, term), the unique index; nothing indexes term alone
+        SearchTrigram.objects.filter(
+            gram__in={gram for term in orphans for gram in trigrams(term)},
+            term__in=orphans,
+        ).delete()
+
+
+@transaction.atomic
+def index_instance(instance):
+    add_trigrams(write_document(instance))
+    # Live search results are cached under the page version
+    pagecache.invalidate()
+
+
+@transaction.atomic
+def remove_instance(instance):
+    documents = SearchDocument.objects.filter(kind=kind_of(instance), object_id=instance.pk)
+    terms = set(SearchTerm.objects.filter(document__in=documents).values_list('term', flat=True))
+    documents.delete()
+    prune_trigrams(terms)
+
+
+REBUILD_BATCH = 500
+
+
+def rebuild():
+    SearchDocument.objects.all().delete()
+    SearchTrigram.objects.all().delete()
+
+    # Terms whose trigrams are stored; most words recur across documents
+    seen = set()
+    count = 0
+
+    for queryset in (
+        Movie.objects.all(),
+        TvShows.objects.all(),
+        Episode.objects.select_related('tvshow'),
+    ):
+        batch = []
+        for instance in queryset.iterator():
+            batch.append(instance)
+            if len(batch) == REBUILD_BATCH:
+                count += index_batch(batch, seen)
+                batch = []
+        count += index_batch(batch, seen)
+
+    # Once complete: results cached meanwhile were of a partial index
+    pagecache.invalidate()
+    return count
+
+
+@transaction.atomic
+def index_batch(instances, seen):
+    """
+    Bulk version of ``index_instance`` for an empty index: one INSERT per
+    table per batch instead of several statements per document.
+    """
+    if not instances:
+        return 0
+
+    fields = [document_fields(instance) for instance in instances]
+    documents = SearchDocument.objects.bulk_create(
+        SearchDocument(kind=kind, object_id=instance.pk, title=title[:255], image=image, boost=boost)
+        for instance, (kind, title, image, boost, terms) in zip(instances, fields)
+    )
+
+    if documents[0].pk is None:
+        # Backends that can't return ids from a bulk INSERT
+        ids = {
+            (kind, object_id): pk
+            for pk, kind, object_id in SearchDocument.objects.filter(
+                object_id__in=[instance.pk for instance in instances]
+            ).values_list('pk', 'kind', 'object_id')
+        }
+        for document in documents:
+            document.pk = ids[(document.kind, document.object_id)]
+
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term, document=document, weight=weight)
+        for document, (kind, title, image, boost, terms) in zip(documents, fields)
+        for term, weight in terms.items()
+    )
+
+    new_terms = {term for *_, terms in fields for term in terms} - seen
+    add_trigrams(new_terms)
+    seen.update(new_terms)
+    return len(instances)
+
+
+# ================= QUERYING =================
+
+def prefix_q(token):
+    return Q(term__gte=token, term__lt=token + PREFIX_END)
+
+
+def corrections(token, prefix=False):
+    """
+    Indexed terms within ``max_edits(token)`` of ``token``, as
+    ``{term: distance}``. Candidates come from the trigram index; with
+    ``prefix`` the token is also compared against each term's start, for
+    words still being typed.
+    """
+    limit = max_edits(token)
+    if not limit:
+        return {}
+
+    grams = trigrams(token)
+    if prefix:
+        # The closing '$' gram only exists for whole words
+        grams = {gram for gram in grams if not gram.endswith('$')}
+
+    candidates = (
+        SearchTrigram.objects
+        .filter(gram__in=grams)
+        .values('term')
+        .annotate(shared=Count('id'))
+        .order_by('-shared')
+        .values_list('term', flat=True)[:FUZZY_CANDIDATES]
+    )
+
+    found = {}
+    for term in candidates:
+        distance = edit_distance(token, term, limit)
+        if prefix and len(term) > len(token):
+            distance = min(distance, edit_distance(token, term[:len(token)], limit))
+        if 0 < distance <= limit:
+            found[term] = distance
+    return found
+
+
+def token_match(token, alternatives, prefixes):
+    q = prefix_q(token)
+    for prefix in prefixes.get(token, ()):
+        q |= prefix_q(prefix)
+    return q | Q(term__in=list(alternatives.get(token, ())))
+
+
+def ranked_documents(tokens, alternatives, limit, prefixes=None):
+    token_qs = [token_match(token, alternatives, prefixes or {}) for token in tokens]
+
+    matches = Q()
+    for token_q in token_qs:
+        matches |= token_q
+
+    # One flag per token so documents must match all of them
+    coverage = {
+        f'has_{i}': Max(Case(When(token_q, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for i, token_q in enumerate(token_qs)
+    }
+
+    factors = [When(term__in=tokens, then=Value(1 + EXACT_BONUS))]
+    factors += [When(prefix_q(token), then=Value(1.0)) for token in tokens]
+    for distance, factor in FUZZY_FACTORS.items():
+        terms = [t for found in alternatives.values() for t, d in found.items() if d == distance]
+        if terms:
+            factors.append(When(term__in=terms, then=Value(factor)))
+
+    rows = (
+        SearchTerm.objects
+        .filter(matches)
+        .values('document_id')
+        .annotate(
+            score=Sum(
+                F('weight') * Case(*factors, default=Value(1.0), output_field=FloatField()),
+                output_field=FloatField(),
+            ),
+            **coverage,
+        )
+        .filter(**{name: 1 for name in coverage})
+        .order_by('-score', 'document_id')[:limit * 2]
+    )
+    scores = {row['document_id']: row['score'] for row in rows}
+
+    documents = SearchDocument.objects.in_bulk(scores)
+    ranked = sorted(
+        documents.values(),
+        key=lambda doc: (-(scores[doc.pk] + doc.boost), doc.pk)
+    )
+    return ranked[:limit]
+
+
+def search(query, limit=16):
+    """
+    Return documents matching every token of ``query`` (each as a prefix),
+    best first: summed term weights, a bonus for whole-word matches, and
+    the document's boost. When that finds fewer than ``limit`` results,
+    misspelled tokens are widened to nearby indexed terms and the search
+    is repeated, with corrected matches ranked below exact ones.
+    """
+    tokens, prefixes = query_tokens(query)
+    if not tokens:
+        return []
+
+    results = ranked_documents(tokens, {}, limit, prefixes)
+    if len(results) >= limit:
+        return results
+
+    last = len(tokens) - 1
+    alternatives = {
+        token: corrections(token, prefix=(i == last))
+        for i, token in enumerate(tokens)
+    }
+    if not any(alternatives.values()):
+        return results
+
+    return ranked_documents(tokens, alternatives, limit, prefixes)
+
+
+# ================= RESULT CACHE =================
+
+# Queries shorter than this, once normalized, match too much to be useful
+MIN_QUERY_LENGTH = 2
+
+RESULT_CACHE_SIZE = 4096
+RESULT_CACHE_TTL = 60  # seconds; also the browsers' max-age
+
+
+def query_key(query):
+    """Queries that search identically share a key: "Dil  wale" and "dil wale"."""
+    tokens, prefixes = query_tokens(query)
+    more = [f'|{prefix}' for token in tokens for prefix in prefixes.get(token, ())]
+    return ' '.join(tokens) + ''.join(more)
+
+
+class ResultCache:
+    """
+    Per-process LRU of recent live-search responses, each kept for
+    ``ttl`` seconds. Keyed by the page version too, which indexing moves,
+    so no worker serves results from before a change.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
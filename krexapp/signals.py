@@ -0,0 +1,139 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import pagecache, rails, search, watchlists
+from .models import Episode, Movie, TvShows
+from .tasks import queue_image_derivatives, queue_media_processing
+from .transcoding import reset_changed_sources, sources_for
+
+
+# ================= UPLOAD PROCESSING =================
+
+@receiver(pre_save, sender=Movie)
+@receiver(pre_save, sender=Episode)
+def track_media_changes(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = None
+    if instance.pk:
+        fields = [source.field for source in sources_for(instance)]
+        previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+    instance._changed_media = reset_changed_sources(instance, previous)
+
+    if any(source.field == 'video' for source in instance._changed_media):
+        # Old seek previews describe the old file
+        instance.previews_vtt = ''
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Episode)
+def queue_upload_jobs(sender, instance, raw=False, **kwargs):
+    changed = getattr(instance, '_changed_media', None)
+    if raw or not changed:
+        return
+
+    instance._changed_media = []
+    queue_media_processing(instance, changed)
+
+
+# ================= IMAGE DERIVATIVES =================
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=TvShows)
+@receiver(post_save, sender=Episode)
+def queue_derivative_jobs(sender, instance, raw=False, **kwargs):
+    if not raw:
+        queue_image_derivatives(instance)
+
+
+# ================= SEARCH INDEX =================
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=TvShows)
+@receiver(post_save, sender=Episode)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    search.index_instance(instance)
+
+    if sender is TvShows:
+        # Episode documents carry the show's title and language
+        for episode in instance.episodes.select_related('tvshow'):
+            search.index_instance(episode)
+
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=TvShows)
+@receiver(post_delete, sender=Episode)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_instance(instance)
+
+
+# ================= BROWSE RAILS =================
+
+@receiver(pre_save, sender=Movie)
+@receiver(pre_save, sender=TvShows)
+def track_rail_changes(sender, instance, raw=False, **kwargs):
+    previous = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values(*rails.RAIL_FIELDS).first()
+
+    instance._rails_changed = rails.rails_changed(instance, previous)
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=TvShows)
+def invalidate_rails_on_save(sender, instance, **kwargs):
+    if getattr(instance, '_rails_changed', True):
+        rails.invalidate(rails.catalog_of(sender))
+
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=TvShows)
+def invalidate_rails_on_delete(sender, instance, **kwargs):
+    rails.invalidate(rails.catalog_of(sender))
+
+
+# ================= WATCHLIST =================
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=TvShows)
+def update_watchlist_copies(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    # Saved rows copy the title's language and year for sorting
+    if created or raw:
+        return
+    if update_fields is not None and not watchlists.COPIED_FIELDS & update_fields:
+        return
+    watchlists.copy_title(instance)
+
+
+@receiver(pre_delete, sender=Movie)
+@receiver(pre_delete, sender=TvShows)
+def invalidate_watchlists_of_title(sender, instance, **kwargs):
+    # The cascade deletes the saved rows without signals of their own
+    watchlists.invalidate_title(instance)
+
+
+@receiver(pre_delete, sender=User)
+def invalidate_watchlist_of_user(sender, instance, **kwargs):
+    watchlists.invalidate(instance.pk)
+
+
+# ================= PAGE CACHE =================
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=TvShows)
+@receiver(post_save, sender=Episode)
+def invalidate_pages_on_save(sender, instance, **kwargs):
+    pagecache.invalidate(instance.updated_at)
+
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=TvShows)
+@receiver(post_delete, sender=Episode)
+def invalidate_pages_on_delete(sender, instance, **kwargs):
+    pagecache.invalidate()
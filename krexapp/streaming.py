@@ -0,0 +1,173 @@
+"""
+Byte-range file serving for the video players.
+
+Browsers seek inside <video> by requesting ``Range: bytes=N-``; answering
+those with 206 responses means a seek only transfers the bytes it needs.
+"""
+
+import mimetypes
+import os
+import re
+from stat import S_ISREG
+
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.shortcuts import redirect
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+CHUNK_SIZE = 64 * 1024
+MAX_AGE = 60 * 60 * 24
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# HLS playlists and segments (see transcoding.py)
+mimetypes.add_type('application/vnd.apple.mpegurl', '.m3u8')
+mimetypes.add_type('video/mp2t', '.ts')
+
+
+# ================= HELPERS =================
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single ``bytes=`` range,
+    ``None`` when the header is absent or not something we serve partially
+    (multi-range requests get the whole file, which RFC 9110 allows), or
+    raise ``ValueError`` when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+
+    if start >= size or end < start:
+        raise ValueError(header)
+
+    return start, min(end, size - 1)
+
+
+def if_range_matches(request, etag, mtime):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+
+    if if_range.startswith(('"', 'W/')):
+        # Weak validators never match for If-Range
+        return if_range == etag
+
+    modified = parse_http_date_safe(if_range)
+    return modified is not None and int(mtime) <= modified
+
+
+def iter_range(fh, start, length):
+    try:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = fh.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        fh.close()
+
+
+# ================= RESPONSE =================
+
+def stream_file(request, field_file):
+    """
+    Serve a FileField's content with ``Range``/``If-Range`` support.
+
+    Full responses and open-ended ranges (``bytes=N-``, which is what
+    players send when seeking) go through ``FileResponse`` so the WSGI
+    server can hand the descriptor to ``sendfile``. Bounded ranges are
+    streamed in ``CHUNK_SIZE`` reads.
+    """
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        # Remote storage: let it serve ranges itself
+        return redirect(field_file.url)
+
+    return stream_path(request, path)
+
+
+def stream_path(request, path, max_age=MAX_AGE):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return HttpResponse(status=404)
+
+    if not S_ISREG(stat.st_mode):
+        return HttpResponse(status=404)
+
+    size = stat.st_size
+    etag = file_etag(stat)
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    if if_range_matches(request, etag, stat.st_mtime):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+    fh = open(path, 'rb')
+
+    if byte_range is None:
+        response = FileResponse(fh, content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+
+        if end == size - 1:
+            fh.seek(start)
+            response = FileResponse(fh, status=206, content_type=content_type)
+        else:
+            response = StreamingHttpResponse(
+                iter_range(fh, start, length),
+                status=206,
+                content_type=content_type
+            )
+
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = f'public, max-age={max_age}'
+    return response
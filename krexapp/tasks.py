@@ -0,0 +1,182 @@
+"""
+Post-upload work run by the job queue (see jobs.py).
+
+Every task takes plain JSON-able arguments and tolerates the row having
+been deleted or its file replaced since the job was queued.
+"""
+
+import hashlib
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Q
+
+from . import images, pagecache
+from .jobs import enqueue, task
+from .models import Episode, Movie, TranscodeStatus, TvShows
+from .transcoding import (
+    HLS_SOURCES,
+    TranscodeError,
+    probe,
+    transcode_source,
+)
+
+MEDIA_MODELS = {
+    'movie': Movie,
+    'episode': Episode,
+}
+
+# image field -> presets (see images.PRESETS) its templates use
+IMAGE_FIELDS = {
+    Movie: {'poster': ('card',), 'banner': ('banner',)},
+    TvShows: {'poster': ('card',), 'banner': ('banner',)},
+    Episode: {'thumbnail': ('thumb', 'banner')},
+}
+
+
+def get_instance(model, pk):
+    return MEDIA_MODELS[model].objects.filter(pk=pk).first()
+
+
+def preview_root():
+    return Path(settings.MEDIA_ROOT) / 'previews'
+
+
+def preview_dir(model, pk):
+    return preview_root() / model / str(pk)
+
+
+def save_thumbnail(episode, frame_path):
+    """Store an extracted frame as the episode thumbnail unless one was uploaded meanwhile."""
+    with open(frame_path, 'rb') as fh:
+        episode.thumbnail.save(f'episode-{episode.pk}.jpg', File(fh), save=False)
+
+    pagecache.update(
+        Episode.objects.filter(Q(thumbnail='') | Q(thumbnail__isnull=True), pk=episode.pk),
+        thumbnail=episode.thumbnail.name,
+    )
+
+    # Saved with update(), so post_save won't queue these
+    queue_image_derivatives(episode)
+    return episode.thumbnail.name
+
+
+def current_rows(instance, field='video'):
+    # Guards every write: skip it if the file changed after the job was queued
+    field_file = getattr(instance, field)
+    return type(instance).objects.filter(pk=instance.pk, **{field: field_file.name})
+
+
+# ================= TASKS =================
+
+@task('media.checksum')
+def checksum_video(model, pk):
+    instance = get_instance(model, pk)
+    if instance is None or not instance.video:
+        return None
+
+    digest = hashlib.sha256()
+    with instance.video.open('rb') as fh:
+        for chunk in fh.chunks():
+            digest.update(chunk)
+
+    checksum = digest.hexdigest()
+    current_rows(instance).update(video_checksum=checksum)
+    return {'sha256': checksum}
+
+
+@task('media.probe')
+def probe_video(model, pk):
+    instance = get_instance(model, pk)
+    if instance is None or not instance.video:
+        return None
+
+    info = probe(instance.video.path)
+    current_rows(instance).update(**info)
+    return info
+
+
+@task('media.thumbnail')
+def extract_thumbnail(pk):
+    # Imported here so web processes don't pay for loading OpenCV
+    from . import previews
+
+    episode = get_instance('episode', pk)
+    if episode is None or not episode.video or episode.thumbnail:
+        return None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        frame = previews.pick_thumbnail(episode.video.path, Path(tmp) / f'episode-{pk}.jpg')
+        name = save_thumbnail(episode, frame)
+
+    return {'thumbnail': name}
+
+
+@task('media.previews')
+def build_previews(model, pk):
+    from . import previews
+
+    instance = get_instance(model, pk)
+    if instance is None or not instance.video:
+        return None
+
+    vtt = previews.build_sprites(instance.video.path, preview_dir(model, pk))
+    name = Path(vtt).relative_to(preview_root()).as_posix()
+
+    pagecache.update(current_rows(instance), previews_vtt=name)
+    return {'vtt': name}
+
+
+@task('media.transcode')
+def transcode_video(model, pk, field):
+    instance = get_instance(model, pk)
+    if instance is None:
+        return None
+
+    source = next(s for s in HLS_SOURCES[type(instance)] if s.field == field)
+
+    if getattr(instance, source.status_field) not in (TranscodeStatus.PENDING, TranscodeStatus.FAILED):
+        # Already handled by an earlier job, or superseded
+        return None
+
+    transcode_source(instance, source)
+
+    instance.refresh_from_db(fields=[source.status_field, source.playlist_field])
+    if getattr(instance, source.status_field) == TranscodeStatus.FAILED:
+        raise TranscodeError(f'{model} {pk} {field} failed to transcode')
+
+    return {'playlist': getattr(instance, source.playlist_field)}
+
+
+@task('images.derivatives')
+def build_image_derivatives(name, presets):
+    return {'created': images.generate_all(name, presets)}
+
+
+# ================= PIPELINE =================
+
+def queue_media_processing(instance, changed_sources):
+    """Queue the post-upload work for the files that changed on ``instance``."""
+    model = next(name for name, cls in MEDIA_MODELS.items() if isinstance(instance, cls))
+    changed = {source.field for source in changed_sources}
+
+    if 'video' in changed and instance.video:
+        enqueue('media.checksum', model=model, pk=instance.pk)
+        enqueue('media.probe', model=model, pk=instance.pk)
+        enqueue('media.previews', model=model, pk=instance.pk)
+
+        if model == 'episode' and not instance.thumbnail:
+            enqueue('media.thumbnail', pk=instance.pk)
+
+    for source in changed_sources:
+        if getattr(instance, source.field):
+            enqueue('media.transcode', model=model, pk=instance.pk, field=source.field)
+
+
+def queue_image_derivatives(instance):
+    for field, presets in IMAGE_FIELDS.get(type(instance), {}).items():
+        image = getattr(instance, field)
+        if image and not images.has_derivatives(image.name, presets):
+            enqueue('images.derivatives', name=image.name, presets=presets)
@@ -0,0 +1,50 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from krexapp.images import CONTENT_TYPES, FORMATS, PRESETS, candidates, derivative_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def srcset(image, preset='card', fmt='webp'):
+    """``srcset`` value for ``image`` (an ImageField value) in one format."""
+    if not image:
+        return ''
+    widths, sizes = PRESETS[preset]
+    return candidates(image.name, widths, fmt)
+
+
+@register.simple_tag
+def responsive_image(image, preset='card', alt='', css_class='', loading='lazy'):
+    """
+    ``<picture>`` with AVIF/WebP sources and a JPEG ``<img>`` fallback,
+    all sized from ``PRESETS[preset]``.
+    """
+    if not image:
+        return ''
+
+    name = image.name
+    widths, sizes = PRESETS[preset]
+
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (CONTENT_TYPES[fmt], candidates(name, widths, fmt), sizes)
+            for fmt in FORMATS if fmt != 'jpeg'
+        )
+    )
+
+    img = format_html(
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}"{} loading="{}" decoding="async">',
+        derivative_url(name, widths[len(widths) // 2], 'jpeg'),
+        candidates(name, widths, 'jpeg'),
+        sizes,
+        alt,
+        format_html(' class="{}"', css_class) if css_class else '',
+        loading,
+    )
+
+    # display: contents keeps existing "parent > img" layout rules working
+    return format_html('<picture style="display: contents">{}{}</picture>', sources, img)
@@ -0,0 +1,261 @@
+"""
+HLS transcoding pipeline.
+
+Each uploaded video is turned into a ladder of H.264/AAC renditions, each
+segmented into an HLS media playlist, plus a master playlist that lets the
+player switch bitrate with the viewer's bandwidth. Output lives under
+``MEDIA_ROOT/hls/<label>/<pk>/`` and is served by ``views.stream_hls``.
+"""
+
+import json
+import logging
+import shutil
+import subprocess
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+
+from . import pagecache
+from .models import Episode, Movie, TranscodeStatus
+
+logger = logging.getLogger(__name__)
+
+
+# ================= CONFIG =================
+
+Rendition = namedtuple('Rendition', 'name height video_bitrate audio_bitrate')
+
+LADDER = (
+    Rendition('1080p', 1080, 5000, 192),
+    Rendition('720p', 720, 2800, 128),
+    Rendition('480p', 480, 1400, 128),
+    Rendition('360p', 360, 800, 96),
+)
+
+SEGMENT_SECONDS = 6
+MASTER_PLAYLIST = 'master.m3u8'
+
+# file field -> (playlist field, status field, directory label)
+HlsSource = namedtuple('HlsSource', 'field playlist_field status_field label')
+
+HLS_SOURCES = {
+    Movie: (
+        HlsSource('video', 'video_hls', 'video_hls_status', 'movie'),
+        HlsSource('trailer', 'trailer_hls', 'trailer_hls_status', 'trailer'),
+    ),
+    Episode: (
+        HlsSource('video', 'video_hls', 'video_hls_status', 'episode'),
+    ),
+}
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def ffmpeg_binary():
+    return getattr(settings, 'FFMPEG_BINARY', 'ffmpeg')
+
+
+def ffprobe_binary():
+    return getattr(settings, 'FFPROBE_BINARY', 'ffprobe')
+
+
+def hls_root():
+    return Path(settings.MEDIA_ROOT) / 'hls'
+
+
+# ================= FFMPEG =================
+
+def run(cmd):
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise TranscodeError(result.stderr.strip()[-2000:] or f'{cmd[0]} failed')
+    return result.stdout
+
+
+def probe(path):
+    """Return ``{'width', 'height', 'duration'}`` for the first video stream."""
+    output = run([
+        ffprobe_binary(), '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height:format=duration',
+        '-of', 'json',
+        str(path),
+    ])
+    data = json.loads(output)
+    streams = data.get('streams') or [{}]
+    duration = data.get('format', {}).get('duration')
+
+    return {
+        'width': streams[0].get('width'),
+        'height': streams[0].get('height'),
+        'duration': float(duration) if duration else None,
+    }
+
+
+def has_audio(path):
+    output = run([
+        ffprobe_binary(), '-v', 'error',
+        '-select_streams', 'a',
+        '-show_entries', 'stream=index',
+        '-of', 'csv=p=0',
+        str(path),
+    ])
+    return bool(output.strip())
+
+
+def ladder_for(height):
+    # Never upscale; always keep at least the smallest rung
+    rungs = [r for r in LADDER if not height or r.height <= height]
+    return rungs or [LADDER[-1]]
+
+
+def transcode_rendition(source, out_dir, rendition, audio):
+    bitrate = rendition.video_bitrate
+
+    cmd = [
+        ffmpeg_binary(), '-y', '-v', 'error',
+        '-i', str(source),
+        '-vf', f'scale=-2:{rendition.height}',
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+        '-b:v', f'{bitrate}k',
+        '-maxrate', f'{int(bitrate * 1.07)}k',
+        '-bufsize', f'{bitrate * 2}k',
+        # A keyframe every SEGMENT_SECONDS of timestamps, whatever the
+        # frame rate, so every rendition cuts its segments at the same times
+        '-force_key_frames', f'expr:gte(t,n_forced*{SEGMENT_SECONDS})', '-sc_threshold', '0',
+    ]
+
+    if audio:
+        cmd += ['-c:a', 'aac', '-ac', '2', '-b:a', f'{rendition.audio_bitrate}k']
+    else:
+        cmd += ['-an']
+
+    cmd += [
+        '-f', 'hls',
+        '-hls_time', str(SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', str(out_dir / f'{rendition.name}_%04d.ts'),
+        str(out_dir / f'{rendition.name}.m3u8'),
+    ]
+    run(cmd)
+
+
+def write_master(out_dir, rungs, width, height, audio):
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+
+    for rendition in rungs:
+        bandwidth = rendition.video_bitrate + (rendition.audio_bitrate if audio else 0)
+        # Keep the source aspect ratio, rounded to even like scale=-2
+        rung_width = int(round(width * rendition.height / height / 2)) * 2 if width and height else None
+        resolution = f',RESOLUTION={rung_width}x{rendition.height}' if rung_width else ''
+        lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth * 1000}{resolution}')
+        lines.append(f'{rendition.name}.m3u8')
+
+    (out_dir / MASTER_PLAYLIST).write_text('\n'.join(lines) + '\n')
+
+
+def transcode(source, out_dir):
+    """
+    Build the full ladder for ``source`` into ``out_dir``.
+
+    Work happens in a sibling temp directory that is swapped in at the end,
+    so players never see a half-written ladder.
+    """
+    out_dir = Path(out_dir)
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+
+    info = probe(source)
+    audio = has_audio(source)
+    rungs = ladder_for(info['height'])
+
+    work_dir = Path(tempfile.mkdtemp(dir=out_dir.parent, prefix='.tmp-'))
+    try:
+        for rendition in rungs:
+            transcode_rendition(source, work_dir, rendition, audio)
+        write_master(work_dir, rungs, info['width'], info['height'], audio)
+
+        if out_dir.exists():
+            shutil.rmtree(out_dir)
+        work_dir.rename(out_dir)
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+    return info
+
+
+# ================= MODEL INTEGRATION =================
+
+def sources_for(instance):
+    return HLS_SOURCES.get(type(instance), ())
+
+
+def reset_changed_sources(instance, previous):
+    """
+    Called before save: any source whose file changed loses its old ladder
+    and goes back to pending (or to nothing if the file was cleared).
+    Returns the sources that changed.
+    """
+    changed = []
+
+    for source in sources_for(instance):
+        current = getattr(instance, source.field)
+        name = current.name if current else ''
+
+        if previous is not None and (previous.get(source.field) or '') == name:
+            continue
+
+        setattr(instance, source.playlist_field, '')
+        setattr(
+            instance,
+            source.status_field,
+            TranscodeStatus.PENDING if name else TranscodeStatus.NONE
+        )
+        changed.append(source)
+
+    return changed
+
+
+def output_dir(instance, source):
+    return hls_root() / source.label / str(instance.pk)
+
+
+def transcode_source(instance, source):
+    """Transcode one file field of ``instance`` and record the outcome."""
+    model = type(instance)
+    rows = model.objects.filter(pk=instance.pk)
+    field_file = getattr(instance, source.field)
+
+    rows.update(**{source.status_field: TranscodeStatus.PROCESSING})
+
+    try:
+        out_dir = output_dir(instance, source)
+        transcode(field_file.path, out_dir)
+    except Exception:
+        logger.exception('HLS transcode failed for %s %s (%s)', model.__name__, instance.pk, source.field)
+        rows.update(**{source.status_field: TranscodeStatus.FAILED})
+        return False
+
+    playlist = (out_dir / MASTER_PLAYLIST).relative_to(hls_root()).as_posix()
+
+    # Only publish if the file wasn't replaced while we were working
+    updated = pagecache.update(rows.filter(**{source.field: field_file.name}), **{
+        source.playlist_field: playlist,
+        source.status_field: TranscodeStatus.READY,
+    })
+    return bool(updated)
+
+
+def pending_sources(statuses=(TranscodeStatus.PENDING,)):
+    for model, sources in HLS_SOURCES.items():
+        for source in sources:
+            queryset = model.objects.filter(
+                **{f'{source.status_field}__in': statuses}
+            ).exclude(**{source.field: ''}).exclude(**{f'{source.field}__isnull': True})
+
+            for instance in queryset.iterator():
+                yield instance, source
@@ -0,0 +1,187 @@
+"""
+Devanagari -> Latin transliteration and a phonetic folding of Latin
+spellings, so "दिलवाले", "Dilwale" and "dilwaale" all reduce to the same
+search key ("dilvale").
+
+This is deliberately lossy: it only has to make the spellings people type
+for the same Hindi title collide, not produce readable romanization.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+VIRAMA = '्'
+NUKTA = '़'
+NASALS = {'ं': 'n', 'ँ': 'n'}  # anusvara, chandrabindu
+VISARGA = 'ः'
+
+VOWELS = {
+    'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ii', 'उ': 'u', 'ऊ': 'uu',
+    'ऋ': 'ri', 'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au', 'ऑ': 'o', 'ऍ': 'e',
+}
+
+MATRAS = {
+    'ा': 'aa', 'ि': 'i', 'ी': 'ii', 'ु': 'u', 'ू': 'uu', 'ृ': 'ri',
+    'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au', 'ॉ': 'o', 'ॅ': 'e',
+}
+
+CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n',
+    'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n',
+    'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm',
+    'य': 'y', 'र': 'r', 'ल': 'l', 'ळ': 'l', 'व': 'v',
+    'श': 'sh', 'ष': 'sh', 'स': 's', 'ह': 'h',
+}
+
+# Consonant + nukta (NFD keeps them as two code points)
+NUKTA_CONSONANTS = {
+    'क': 'q', 'ख': 'kh', 'ग': 'g', 'ज': 'z', 'ड': 'r', 'ढ': 'rh', 'फ': 'f', 'य': 'y',
+}
+
+DIGITS = {chr(0x0966 + i): str(i) for i in range(10)}
+
+# Applied in order to Latin text. Some fold a letter together with the
+# next one, so a word cut short can fold to something that is not the
+# start of the whole word's key; prefix_keys covers those
+FOLD_RULES = [
+    (re.compile(r'ee'), 'i'),
+    (re.compile(r'oo'), 'u'),
+    (re.compile(r'([kgcjtdpb])h'), r'\1'),  # aspirates: bh -> b, chh -> ch -> c
+    (re.compile(r'sh'), 's'),
+    (re.compile(r'ph'), 'f'),
+    (re.compile(r'w'), 'v'),
+    (re.compile(r'q'), 'k'),
+    (re.compile(r'z'), 'j'),
+    (re.compile(r'([aeiou])y(?=[aeiou])'), r'\1'),  # dulhaniya -> dulhania
+    (re.compile(r'(.)\1+'), r'\1'),  # aa -> a, nn -> n, ...
+]
+
+# Vowels that fold with a second one (ee -> i, oo -> u)
+DOUBLED_VOWELS = 'eo'
+GLIDE_END_RE = re.compile(r'[aeiou]y$')
+
+LATIN_RE = re.compile(r'^[a-z0-9]+$')
+
+
+def is_devanagari(char):
+    return 'ऀ' <= char <= 'ॿ'
+
+
+# ================= TRANSLITERATION =================
+
+def syllables(word):
+    """
+    Split a Devanagari word into ``[consonants, vowel, inherent]`` units,
+    where ``inherent`` marks a vowel that is only the implicit schwa.
+    """
+    units = []
+    chars = unicodedata.normalize('NFD', word)
+    i = 0
+
+    while i < len(chars):
+        char = chars[i]
+        following = chars[i + 1] if i + 1 < len(chars) else ''
+
+        if char in CONSONANTS:
+            if following == NUKTA:
+                sound = NUKTA_CONSONANTS.get(char, CONSONANTS[char])
+                i += 1
+                following = chars[i + 1] if i + 1 < len(chars) else ''
+            else:
+                sound = CONSONANTS[char]
+
+            if following in MATRAS:
+                units.append([sound, MATRAS[following], False])
+                i += 1
+            elif following == VIRAMA:
+                units.append([sound, '', False])
+                i += 1
+            else:
+                units.append([sound, 'a', True])
+
+        elif char in VOWELS:
+            units.append(['', VOWELS[char], False])
+
+        elif char in NASALS or char == VISARGA:
+            if units:
+                units[-1][1] += NASALS.get(char, 'h')
+                units[-1][2] = False  # a nasalised schwa is pronounced
+
+        elif char in DIGITS:
+            units.append([DIGITS[char], '', False])
+
+        elif not is_devanagari(char):
+            units.append([char, '', False])
+
+        i += 1
+
+    return units
+
+
+def delete_schwas(units):
+    """
+    Hindi drops the inherent 'a' at the end of a word and between a vowel
+    and a following full syllable (दिलवाले -> dil-vaa-le, not di-la-vaa-le).
+    """
+    if len(units) > 1 and units[-1][2]:
+        units[-1][1] = ''
+
+    for i in range(1, len(units) - 1):
+        previous, current, following = units[i - 1], units[i], units[i + 1]
+        if (
+            current[2]
+            and current[1]
+            and previous[1]
+            and following[0]
+            and following[1]
+        ):
+            current[1] = ''
+
+    return units
+
+
+def transliterate(text):
+    """Romanize any Devanagari words in ``text``; everything else passes through."""
+    if not any(is_devanagari(c) for c in text):
+        return text
+
+    def convert(match):
+        units = delete_schwas(syllables(match.group(0)))
+        return ''.join(consonant + vowel for consonant, vowel, _ in units)
+
+    return re.sub(r'[ऀ-ॿ]+', convert, text)
+
+
+# ================= FOLDING =================
+
+def fold(word):
+    """Collapse common spelling variants of a romanized word."""
+    if not LATIN_RE.match(word):
+        return word
+
+    for pattern, replacement in FOLD_RULES:
+        word = pattern.sub(replacement, word)
+    return word
+
+
+@lru_cache(maxsize=65536)  # vocabularies repeat heavily across documents
+def search_key(word):
+    return fold(transliterate(word))
+
+
+def prefix_keys(word):
+    """
+    Every search key the words starting with ``word`` can start with:
+    "de" as "dee" folds to "di" (Deewana), "kho" as "khoo" to "ku"
+    (Khoobsurat), and "dulhaniy" loses its y once the next vowel arrives.
+    """
+    keys = {search_key(word)}
+    if LATIN_RE.match(word):
+        if word[-1] in DOUBLED_VOWELS and not word.endswith(word[-1] * 2):
+            keys.add(search_key(word + word[-1]))
+        if GLIDE_END_RE.search(word):
+            keys.add(search_key(word[:-1]))
+    return keys
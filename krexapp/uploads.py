@@ -0,0 +1,250 @@
+"""
+Resumable chunked uploads for large video files.
+
+The browser creates an upload, PUTs the file in slices at the offset the
+server reports, and finalizes it with the SHA-256 it computed of the
+whole file, which must match what the server stored. Slices are streamed straight onto a
+``.part`` file, so memory stays bounded by ``READ_SIZE`` and a dropped
+connection only loses the slice in flight. A slice is written under an
+exclusive lock on the ``.part`` file, and only at the offset committed
+when it got the lock, so a stale or duplicate PUT never touches bytes
+another request already stored. Finished uploads are handed to the model
+forms as already-on-disk files, which the storage moves into place
+instead of copying.
+"""
+
+import hashlib
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: the offset check in write_chunk still applies
+    fcntl = None
+
+from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+from .models import ChunkedUpload
+
+READ_SIZE = 64 * 1024
+
+
+def max_chunk_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK', 16 * 1024 * 1024)
+
+
+def upload_dir():
+    return Path(settings.MEDIA_ROOT) / 'uploads' / 'chunked'
+
+
+def part_path(upload):
+    return upload_dir() / f'{upload.pk}.part'
+
+
+class UploadConflict(Exception):
+    """The client's view of the offset is out of date."""
+
+
+# ================= WRITING =================
+
+def start_upload(user, filename, size):
+    upload = ChunkedUpload.objects.create(
+        user=user,
+        filename=os.path.basename(filename)[:255],
+        size=size,
+    )
+    upload_dir().mkdir(parents=True, exist_ok=True)
+    part_path(upload).touch()
+    return upload
+
+
+@contextmanager
+def locked_part(upload):
+    """The open ``.part`` file of ``upload``, held by one request at a time."""
+    with open(part_path(upload), 'r+b') as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield fh
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Write ``length`` bytes read from ``stream`` at ``offset``.
+
+    Offsets must match what the server has, which is what makes retries
+    safe: a client that lost a response asks for the offset and resends
+    from there.
+    """
+    if upload.completed or offset != upload.offset:
+        raise UploadConflict(upload.offset)
+
+    if length > max_chunk_size() or offset + length > upload.size:
+        raise ValueError('Chunk too large')
+
+    with locked_part(upload) as fh:
+        # Another request may have committed this slice while we waited
+        upload.refresh_from_db(fields=['offset', 'completed'])
+        if upload.completed or offset != upload.offset:
+            raise UploadConflict(upload.offset)
+
+        # Never truncated: slices stop at upload.size, and bytes past the
+        # committed offset are overwritten by the next slice
+        fh.seek(offset)
+        written = 0
+        while written < length:
+            data = stream.read(min(READ_SIZE, length - written))
+            if not data:
+                break
+            fh.write(data)
+            written += len(data)
+
+        if written != length:
+            # Client went away mid-chunk; nothing to commit
+            raise UploadConflict(upload.offset)
+
+        # Without flock (Windows) only one writer of a slice can still win
+        updated = ChunkedUpload.objects.filter(pk=upload.pk, offset=offset).update(
+            offset=offset + written
+        )
+        if not updated:
+            upload.refresh_from_db(fields=['offset'])
+            raise UploadConflict(upload.offset)
+
+    upload.offset = offset + written
+    return upload.offset
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(READ_SIZE * 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize_upload(upload, sha256):
+    """Verify size and the client's checksum, and mark complete."""
+    if upload.offset != upload.size:
+        raise UploadConflict(upload.offset)
+
+    if not sha256:
+        raise ValueError('The SHA-256 of the file is required')
+
+    checksum = file_sha256(part_path(upload))
+    if sha256.lower() != checksum:
+        raise ValueError('Checksum mismatch')
+
+    upload.sha256 = checksum
+    upload.completed = True
+    upload.save(update_fields=['sha256', 'completed', 'updated_at'])
+    return upload
+
+
+def discard_upload(upload):
+    part_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+
+# ================= FORM INTEGRATION =================
+
+class AssembledUpload(UploadedFile):
+    """A finished chunked upload, presented like Django's temp-file uploads."""
+
+    def __init__(self, upload):
+        self.upload = upload
+        self.path = part_path(upload)
+        super().__init__(name=upload.filename, size=upload.size)
+
+    @property
+    def file(self):
+        # Opened on first read: the storage moves the file by its path, and
+        # a form that fails validation never reads it at all
+        if self._file is None:
+            self._file = open(self.path, 'rb')
+        return self._file
+
+    @file.setter
+    def file(self, value):
+        self._file = value
+
+    @property
+    def closed(self):
+        return self._file is None or self._file.closed
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def temporary_file_path(self):
+        return str(self.path)
+
+
+class ChunkedUploadFormMixin:
+    """
+    Lets a ModelForm take ``chunked_fields`` either as normal multipart
+    files or as the id of a completed ``ChunkedUpload`` posted in the
+    hidden ``<field>_upload`` input. Only ``user``'s own uploads are
+    accepted.
+    """
+
+    chunked_fields = ()
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chunked_uploads = []
+
+        for name in self.chunked_fields:
+            self.fields[name].widget.attrs['data-chunked'] = f'{name}_upload'
+            self.fields[f'{name}_upload'] = forms.UUIDField(
+                required=False, widget=forms.HiddenInput
+            )
+
+            upload_id = self.data.get(f'{name}_upload') if self.is_bound else None
+            if not upload_id or self.files.get(name):
+                continue
+
+            try:
+                upload_id = uuid.UUID(str(upload_id))
+            except ValueError:
+                continue
+
+            upload = ChunkedUpload.objects.filter(pk=upload_id, user=user, completed=True).first()
+            if upload is None or not part_path(upload).exists():
+                continue
+
+            self.files = self.files.copy()
+            self.files[name] = AssembledUpload(upload)
+            self.chunked_uploads.append(upload)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        used = {str(upload.pk) for upload in self.chunked_uploads}
+
+        for name in self.chunked_fields:
+            upload_id = cleaned_data.get(f'{name}_upload')
+            if upload_id and str(upload_id) not in used:
+                self.add_error(name, 'The uploaded file is missing or incomplete; please upload it again.')
+
+        return cleaned_data
+
+    def save(self, commit=True):
+        instance = super().save(commit=commit)
+
+        if commit:
+            for name in self.chunked_fields:
+                if isinstance(self.files.get(name), AssembledUpload):
+                    self.files[name].close()
+
+            # The storage has moved the .part files into place
+            for upload in self.chunked_uploads:
+                discard_upload(upload)
+
+        return instance
@@ -30,12 +30,37 @@ urlpatterns = [
     path('watch-episode/<int:id>/', views.watch_episode, name='watch_episode'),
     path('watchlist-show/<int:show_id>/', views.toggle_tvshow_watchlist, name='toggle_tvshow_watchlist'),
 
+    # ================= WATCH PROGRESS =================
+    path('api/progress/', views.watch_heartbeat, name='watch_heartbeat'),
+
+    # ================= STREAMING =================
+    path('stream/movie/<int:id>/', views.stream_movie, name='stream_movie'),
+    path('stream/trailer/<int:id>/', views.stream_trailer, name='stream_trailer'),
+    path('stream/episode/<int:id>/', views.stream_episode, name='stream_episode'),
+    path('stream/hls/<path:path>', views.stream_hls, name='stream_hls'),
+    path('stream/previews/<path:path>', views.stream_previews, name='stream_previews'),
+
+    # ================= IMAGES =================
+    path('img/<int:width>/<str:fmt>/<path:name>', views.image_derivative, name='image_derivative'),
+
     # ================= WATCHLIST =================
     path('my-watchlist/', views.watchlist_view, name='watchlist'),
 
+    # ================= WATCHLIST API =================
+    path('api/watchlist/', views.watchlist_items, name='watchlist_items'),
+    path('api/watchlist/bulk/', views.watchlist_bulk, name='watchlist_bulk'),
+    path('api/watchlist/<str:catalog>/<int:object_id>/', views.watchlist_item, name='watchlist_item'),
+
     # ================= LIVE SEARCH =================
     path('live-search/', views.live_search, name='live_search'),
 
+    # ================= CATALOG PAGINATION API =================
+    path('api/rails/<str:catalog>/<str:rail>/', views.catalog_rail, name='catalog_rail'),
+    path('api/shows/<int:show_id>/episodes/', views.show_episodes, name='show_episodes'),
+
+    # ================= METRICS (PROMETHEUS) =================
+    path('metrics', views.metrics_view, name='metrics'),
+
     # ================= CUSTOM ADMIN PANEL =================
     path('admin-panel/', views.admin_dashboard, name='admin_dashboard'),
     path('admin-panel/movies/', views.admin_movies, name='admin_movies'),
@@ -45,4 +70,8 @@ urlpatterns = [
     path('admin-panel/add-show/', views.add_show, name='add_show'),
 
     path('admin-panel/add-episode/', views.add_episode, name='add_episode'),
+
+    path('admin-panel/uploads/', views.upload_start, name='upload_start'),
+    path('admin-panel/uploads/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+    path('admin-panel/uploads/<uuid:upload_id>/finalize/', views.upload_finalize, name='upload_finalize'),
 ]
\ No newline at end of file
@@ -1,9 +1,33 @@
+import json
+import math
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
 from django.forms import ModelForm
 from django.contrib.auth import authenticate, login, logout
-from .models import Movie, Watchlist, TvShows, Episode
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import urlencode
+from django.db.models import Count
+from . import images, metrics, pagecache, progress, rails, recommendations, search, watchlists
+from .models import Movie, TvShows, Episode, Job, JobStatus, ChunkedUpload
+from .pagination import InvalidCursor, paginate
+from .streaming import stream_file, stream_path
+from .tasks import preview_root
+from .transcoding import hls_root
+from .uploads import (
+    ChunkedUploadFormMixin,
+    UploadConflict,
+    finalize_upload,
+    max_chunk_size,
+    start_upload,
+    write_chunk,
+)
 
 
 # ==========================================================
@@ -22,17 +46,22 @@ def admin_required(view_func):
 
 @login_required
 def home(request):
-    return render(request, 'index.html')
+    return render(request, 'index.html', {
+        'continue_watching': progress.continue_watching(request.user),
+    })
 
 
 # ==========================================================
 # 📄 STATIC PAGES
 # ==========================================================
 
+@pagecache.cache_for_anonymous
 def about(request):
-    return render(request, 'aboutus.html')
+    # Shares the movies page template, with every rail empty
+    return render(request, 'aboutus.html', {'rails_timeout': rails.TIMEOUT})
 
 
+@pagecache.cache_for_anonymous
 def contact(request):
     return render(request, 'contactus.html')
 
@@ -41,61 +70,61 @@ def contact(request):
 # 🎬 MOVIES PAGE
 # ==========================================================
 
+def in_user_watchlist(request, catalog, object_id):
+    return object_id in getattr(watchlists.for_request(request), catalog)
+
+
+def rail_context(catalog, names):
+    """Template context for a rails page: first pages plus their cursors."""
+    version, built = rails.get(catalog)
+
+    context = {
+        'rails_version': version,
+        'rails_timeout': rails.TIMEOUT,
+        'rail_cursors': {rail: cursor for rail, (rows, cursor) in built.items()},
+    }
+    for rail, name in names.items():
+        context[name] = built[rail][0]
+    return context
+
+
+@pagecache.cache_for_anonymous
 def movies(request):
-    trending_movies = Movie.objects.filter(is_trending=True)
-    hindi_movies = Movie.objects.filter(is_hindi=True)
-    english_movies = Movie.objects.filter(is_english=True)
-    top_movies = Movie.objects.filter(
-        top_rank__isnull=False
-    ).order_by('top_rank')[:10]
-
-    return render(request, 'aboutus.html', {
-        'trending_movies': trending_movies,
-        'hindi_movies': hindi_movies,
-        'english_movies': english_movies,
-        'top_movies': top_movies
-    })
+    return render(request, 'aboutus.html', rail_context('movies', {
+        'trending': 'trending_movies',
+        'hindi': 'hindi_movies',
+        'english': 'english_movies',
+        'top': 'top_movies',
+    }))
 
 
 # ==========================================================
 # 📺 TV SHOWS PAGE
 # ==========================================================
 
+@pagecache.cache_for_anonymous
 def tv_shows(request):
-    trending_shows = TvShows.objects.filter(is_trending=True)
-    hindi_shows = TvShows.objects.filter(is_hindi=True)
-    english_shows = TvShows.objects.filter(is_english=True)
-    top_shows = TvShows.objects.filter(
-        top_rank__isnull=False
-    ).order_by('top_rank')[:10]
-
-    return render(request, 'tvshows.html', {
-        'trending_shows': trending_shows,
-        'hindi_shows': hindi_shows,
-        'english_shows': english_shows,
-        'top_shows': top_shows
-    })
+    return render(request, 'tvshows.html', rail_context('shows', {
+        'trending': 'trending_shows',
+        'hindi': 'hindi_shows',
+        'english': 'english_shows',
+        'top': 'top_shows',
+    }))
 
 
 # ==========================================================
 # 🎥 MOVIE DETAIL
 # ==========================================================
 
+@pagecache.conditional(model=Movie)
+@pagecache.cache_for_anonymous
 def movie_detail(request, id):
     movie = get_object_or_404(Movie, id=id)
-    related_movies = Movie.objects.exclude(id=id).order_by('-created_at')[:10]
-
-    in_watchlist = False
-    if request.user.is_authenticated:
-        in_watchlist = Watchlist.objects.filter(
-            user=request.user,
-            movie=movie
-        ).exists()
 
     return render(request, 'movie_detail.html', {
         'movie': movie,
-        'related_movies': related_movies,
-        'in_watchlist': in_watchlist
+        'related_movies': recommendations.related(Movie, id),
+        'in_watchlist': in_user_watchlist(request, 'movies', id)
     })
 
 
@@ -103,25 +132,24 @@ def movie_detail(request, id):
 # 📺 SHOW DETAIL
 # ==========================================================
 
+@pagecache.conditional(model=TvShows)
+@pagecache.cache_for_anonymous
 def shows_detail(request, id):
-    show = get_object_or_404(
-        TvShows.objects.prefetch_related('episodes'),
-        id=id
-    )
-
-    related_shows = TvShows.objects.exclude(id=id).order_by('-created_at')[:10]
+    show = get_object_or_404(TvShows, id=id)
 
-    in_watchlist = False
+    continue_watching = []
     if request.user.is_authenticated:
-        in_watchlist = Watchlist.objects.filter(
-            user=request.user,
-            tvshow=show
-        ).exists()
+        continue_watching = progress.continue_watching(request.user, show_id=id)
 
     return render(request, 'shows_details.html', {
         'show': show,
-        'related_shows': related_shows,
-        'in_watchlist': in_watchlist
+        # (episodes, cursor), only queried when the cached list is stale
+        'episodes_page': SimpleLazyObject(
+            lambda: paginate(Episode.objects.filter(tvshow_id=id), EPISODE_ORDERING)
+        ),
+        'related_shows': recommendations.related(TvShows, id),
+        'in_watchlist': in_user_watchlist(request, 'shows', id),
+        'continue_watching': continue_watching,
     })
 
 
@@ -129,6 +157,8 @@ def shows_detail(request, id):
 # 🎞 EPISODE DETAIL
 # ==========================================================
 
+@pagecache.conditional(model=Episode)
+@pagecache.cache_for_anonymous
 def episode_detail(request, id):
     episode = get_object_or_404(
         Episode.objects.select_related('tvshow'),
@@ -141,21 +171,12 @@ def episode_detail(request, id):
         tvshow=show
     ).exclude(id=id)
 
-    related_shows = TvShows.objects.exclude(id=show.id).order_by('-created_at')[:10]
-
-    in_watchlist = False
-    if request.user.is_authenticated:
-        in_watchlist = Watchlist.objects.filter(
-            user=request.user,
-            tvshow=show
-        ).exists()
-
     return render(request, 'episode_detail.html', {
         'episode': episode,
         'show': show,
         'related_episodes': related_episodes,
-        'related_shows': related_shows,
-        'in_watchlist': in_watchlist
+        'related_shows': recommendations.related(TvShows, show.id),
+        'in_watchlist': in_user_watchlist(request, 'shows', show.id)
     })
 
 
@@ -165,7 +186,11 @@ def episode_detail(request, id):
 
 def watch_movie(request, id):
     movie = get_object_or_404(Movie, id=id)
-    return render(request, "watch_movie.html", {"movie": movie})
+    return render(request, "watch_movie.html", {
+        "movie": movie,
+        "resume_at": progress.resume_position(request.user, 'movie', movie.id),
+        "heartbeat_seconds": progress.HEARTBEAT_SECONDS,
+    })
 
 
 def watch_episode(request, id):
@@ -175,89 +200,362 @@ def watch_episode(request, id):
     )
     return render(request, "watch_episode.html", {
         "episode": episode,
-        "show": episode.tvshow
+        "show": episode.tvshow,
+        "resume_at": progress.resume_position(request.user, 'episode', episode.id),
+        "heartbeat_seconds": progress.HEARTBEAT_SECONDS,
     })
 
 
+@login_required
+@require_POST
+def watch_heartbeat(request):
+    try:
+        data = json.loads(request.body)
+        kind = str(data['kind'])
+        object_id = int(data['id'])
+        position = float(data['position'])
+        duration = float(data['duration']) if data.get('duration') else None
+        stopped = bool(data.get('stopped'))
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'kind, id and position are required'}, status=400)
+
+    if kind not in progress.KINDS:
+        return JsonResponse({'error': 'kind must be movie or episode'}, status=400)
+    if not (math.isfinite(position) and position >= 0) or (
+        duration is not None and not (math.isfinite(duration) and duration > 0)
+    ):
+        return JsonResponse({'error': 'position and duration must be finite seconds'}, status=400)
+
+    progress.record(request.user, kind, object_id, position, duration, stopped)
+    return HttpResponse(status=204)
+
+
 # ==========================================================
-# ⭐ WATCHLIST
+# 📡 STREAMING (RANGE REQUESTS)
 # ==========================================================
 
-@login_required
-def toggle_watchlist(request, movie_id):
-    movie = get_object_or_404(Movie, id=movie_id)
+@require_safe
+def stream_movie(request, id):
+    movie = get_object_or_404(Movie.objects.only('video'), id=id)
+    if not movie.video:
+        raise Http404
+    return stream_file(request, movie.video)
+
+
+@require_safe
+def stream_trailer(request, id):
+    movie = get_object_or_404(Movie.objects.only('trailer'), id=id)
+    if not movie.trailer:
+        raise Http404
+    return stream_file(request, movie.trailer)
+
+
+@require_safe
+def stream_episode(request, id):
+    episode = get_object_or_404(Episode.objects.only('video'), id=id)
+    if not episode.video:
+        raise Http404
+    return stream_file(request, episode.video)
+
+
+@require_safe
+def stream_hls(request, path):
+    try:
+        full_path = safe_join(hls_root(), path)
+    except SuspiciousFileOperation:
+        raise Http404
+    return stream_path(request, full_path)
 
-    watch_item, created = Watchlist.objects.get_or_create(
-        user=request.user,
-        movie=movie
-    )
 
-    if not created:
-        watch_item.delete()
+@require_safe
+def stream_previews(request, path):
+    try:
+        full_path = safe_join(preview_root(), path)
+    except SuspiciousFileOperation:
+        raise Http404
+    return stream_path(request, full_path)
 
-    return redirect('movie_detail', id=movie.id)
 
+# ==========================================================
+# 🖼 IMAGE DERIVATIVES
+# ==========================================================
+
+@require_safe
+def image_derivative(request, width, fmt, name):
+    if width not in images.WIDTHS or fmt not in images.FORMATS:
+        raise Http404
+
+    try:
+        path = images.generate(name, width, fmt)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+
+    # The URL changes whenever the original is replaced
+    return stream_path(request, path, max_age=60 * 60 * 24 * 365)
+
+
+# ==========================================================
+# ⭐ WATCHLIST
+# ==========================================================
 
 @login_required
-def toggle_tvshow_watchlist(request, show_id):
-    show = get_object_or_404(TvShows, id=show_id)
+def toggle_watchlist(request, movie_id):
+    if watchlists.toggle(request.user.pk, 'movies', movie_id) is None:
+        raise Http404
 
-    watch_item, created = Watchlist.objects.get_or_create(
-        user=request.user,
-        tvshow=show
-    )
+    return redirect('movie_detail', id=movie_id)
 
-    if not created:
-        watch_item.delete()
+
+@login_required
+def toggle_tvshow_watchlist(request, show_id):
+    if watchlists.toggle(request.user.pk, 'shows', show_id) is None:
+        raise Http404
 
     return redirect(request.META.get('HTTP_REFERER', 'index'))
 
 
 @login_required
 def watchlist_view(request):
-    watchlist_items = Watchlist.objects.filter(
-        user=request.user
-    ).order_by('-added_on')
+    filters = watchlist_filters(request)
+    items, cursor = watchlists.page(request.user.pk, **filters)
 
     return render(request, 'watchlist.html', {
-        'watchlist_movies': watchlist_items
+        'watchlist_items': items,
+        'watchlist_cursor': cursor,
+        'filters': filters,
+        # Carried over to the API pages loaded on scroll
+        'filter_query': urlencode({name: value for name, value in filters.items() if value is not None}),
+        'languages': watchlists.languages(request.user.pk),
+        'years': watchlists.years(request.user.pk),
+        'sorts': watchlists.SORTS,
     })
 
 
+def watchlist_filters(request):
+    """Sort and filters from the query string; unknown values are dropped."""
+    sort = request.GET.get('sort', '')
+    kind = request.GET.get('kind', '')
+    year = request.GET.get('year', '')
+
+    return {
+        'sort': sort if sort in watchlists.SORTS else 'added',
+        'kind': kind if kind in watchlists.FIELDS else '',
+        'language': request.GET.get('language', '').strip(),
+        'year': int(year) if year.isdigit() else None,
+    }
+
+
+# ==========================================================
+# ⭐ WATCHLIST API
+# ==========================================================
+
+def watchlist_ids(data, catalog):
+    """IDs listed under ``catalog`` in a bulk request, or ValueError."""
+    ids = data.get(catalog, [])
+    if not isinstance(ids, list) or len(ids) > watchlists.MAX_BULK:
+        raise ValueError
+    return [int(object_id) for object_id in ids]
+
+
+@login_required
+@require_safe
+def watchlist_items(request):
+    def serialize(item):
+        catalog, title = ('movies', item.movie) if item.movie_id else ('shows', item.tvshow)
+        return {
+            'catalog': catalog,
+            'id': title.id,
+            'title': title.title,
+            'url': reverse(DETAIL_VIEWS[catalog], args=[title.id]),
+            'poster': images.picture_data(title.poster, 'card'),
+            'language': item.language,
+            'release_year': item.release_year,
+            'added_on': item.added_on.isoformat(),
+        }
+
+    filters = watchlist_filters(request)
+    return page_response(
+        request,
+        lambda cursor, size: watchlists.page(request.user.pk, cursor, size, **filters),
+        serialize,
+    )
+
+
+@login_required
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+def watchlist_item(request, catalog, object_id):
+    if catalog not in watchlists.FIELDS:
+        raise Http404
+
+    if request.method == 'PUT':
+        if not watchlists.add(request.user.pk, catalog, [object_id]):
+            raise Http404
+        saved = True
+    elif request.method == 'DELETE':
+        watchlists.remove(request.user.pk, catalog, [object_id])
+        saved = False
+    else:
+        saved = object_id in getattr(watchlists.for_request(request), catalog)
+
+    return JsonResponse({'catalog': catalog, 'id': object_id, 'in_watchlist': saved})
+
+
+@login_required
+@require_POST
+def watchlist_bulk(request):
+    """
+    ``{"add": {"movies": [ids], "shows": [ids]}, "remove": {...}}``;
+    answers with every title now saved, like the context processor's.
+    """
+    try:
+        data = json.loads(request.body)
+        changes = {
+            action: {catalog: watchlist_ids(data.get(action, {}), catalog) for catalog in watchlists.FIELDS}
+            for action in ('add', 'remove')
+        }
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse(
+            {'error': f'add and remove map movies and shows to at most {watchlists.MAX_BULK} ids'},
+            status=400,
+        )
+
+    for catalog, ids in changes['remove'].items():
+        if ids:
+            watchlists.remove(request.user.pk, catalog, ids)
+    for catalog, ids in changes['add'].items():
+        if ids:
+            watchlists.add(request.user.pk, catalog, ids)
+
+    membership = watchlists.for_user(request.user)
+    return JsonResponse({'movies': membership.movie_ids, 'shows': membership.show_ids})
+
+
 # ==========================================================
 # 🔎 LIVE SEARCH
 # ==========================================================
 
+def search_resource(request):
+    return search.query_key(request.GET.get('q', ''))
+
+
+@pagecache.conditional(per_user=False, resource=search_resource)
 def live_search(request):
-    query = request.GET.get('q')
-    results = []
+    query = request.GET.get('q', '')
+    key = search.query_key(query)
 
-    if query:
-        movies = Movie.objects.filter(
-            title__icontains=query
-        )[:8]
+    if len(key) < search.MIN_QUERY_LENGTH:
+        body = EMPTY_SEARCH
+    else:
+        # Under the catalog version, like the ETag the body is sent with,
+        # so no worker pairs an old body with a new ETag
+        cache_key = (pagecache.version(), key)
+        body = search.result_cache.get(cache_key)
+        if body is None:
+            documents = search.search(query, limit=16)
+            body = search_body([
+                {
+                    'id': document.object_id,
+                    'title': document.title,
+                    'poster': search_thumbnail_url(document.image),
+                    'type': document.kind
+                }
+                for document in documents
+            ])
+            search.result_cache.set(cache_key, body)
 
-        shows = TvShows.objects.filter(
-            title__icontains=query
-        )[:8]
+    response = HttpResponse(body, content_type='application/json')
+    # Results are the same for everyone, so shared caches may keep them too
+    patch_cache_control(response, public=True, max_age=search.RESULT_CACHE_TTL)
+    return response
 
-        for movie in movies:
-            results.append({
-                'id': movie.id,
-                'title': movie.title,
-                'poster': movie.poster.url if movie.poster else '',
-                'type': 'movie'
-            })
 
-        for show in shows:
-            results.append({
-                'id': show.id,
-                'title': show.title,
-                'poster': show.poster.url if show.poster else '',
-                'type': 'show'
-            })
+def search_body(results):
+    return json.dumps(results, separators=(',', ':')).encode()
 
-    return JsonResponse(results, safe=False)
+
+EMPTY_SEARCH = search_body([])
+
+
+def search_thumbnail_url(name):
+    if not name:
+        return ''
+    return reverse('image_derivative', args=[160, 'jpeg', name])
+
+
+# ==========================================================
+# 📜 CATALOG PAGINATION API
+# ==========================================================
+
+EPISODE_ORDERING = ('season', 'episode_number', 'id')
+
+DETAIL_VIEWS = {'movies': 'movie_detail', 'shows': 'shows_detail'}
+
+
+def page_response(request, queryset_page, serialize):
+    """
+    Run ``queryset_page(cursor, size)`` for the request's ``cursor`` and
+    ``limit`` and return ``{"results": [...], "next": cursor or null}``.
+    """
+    try:
+        rows, cursor = queryset_page(
+            request.GET.get('cursor') or None,
+            int(request.GET.get('limit', rails.PAGE_SIZE)),
+        )
+    except (InvalidCursor, ValueError):
+        return JsonResponse({'error': 'Invalid cursor or limit'}, status=400)
+
+    return JsonResponse({
+        'results': [serialize(row) for row in rows],
+        'next': cursor,
+    })
+
+
+@require_safe
+@pagecache.conditional(per_user=False)
+def catalog_rail(request, catalog, rail):
+    if catalog not in rails.CATALOGS or rail not in rails.RAILS:
+        raise Http404
+
+    def serialize(item):
+        return {
+            'id': item.id,
+            'title': item.title,
+            'url': reverse(DETAIL_VIEWS[catalog], args=[item.id]),
+            'poster': images.picture_data(item.poster, 'card'),
+        }
+
+    return page_response(
+        request,
+        lambda cursor, size: rails.page(catalog, rail, cursor, size),
+        serialize,
+    )
+
+
+@require_safe
+@pagecache.conditional(per_user=False)
+def show_episodes(request, show_id):
+    episodes = Episode.objects.filter(tvshow_id=show_id)
+
+    def episodes_page(cursor, size):
+        rows, next_cursor = paginate(episodes, EPISODE_ORDERING, cursor, size)
+        # Only an empty first page needs to tell a show without
+        # episodes from one that doesn't exist
+        if not rows and not cursor and not TvShows.objects.filter(id=show_id).exists():
+            raise Http404
+        return rows, next_cursor
+
+    def serialize(episode):
+        return {
+            'id': episode.id,
+            'title': episode.title,
+            'season': episode.season,
+            'episode_number': episode.episode_number,
+            'description': episode.description,
+            'url': reverse('episode_detail', args=[episode.id]),
+            'thumbnail': images.picture_data(episode.thumbnail, 'thumb'),
+        }
+
+    return page_response(request, episodes_page, serialize)
 
 
 # ==========================================================
@@ -266,26 +564,41 @@ def live_search(request):
 
 @admin_required
 def admin_dashboard(request):
+    job_counts = dict(
+        Job.objects.values_list('status').annotate(total=Count('id')).order_by()
+    )
+
     return render(request, 'admin_panel/dashboard.html', {
         'total_movies': Movie.objects.count(),
         'total_shows': TvShows.objects.count(),
         'total_episodes': Episode.objects.count(),
+        'job_counts': [
+            (label, job_counts.get(status, 0))
+            for status, label in JobStatus.choices
+        ],
+        'recent_jobs': Job.objects.all()[:15],
     })
 
 
-class MovieForm(ModelForm):
+class MovieForm(ChunkedUploadFormMixin, ModelForm):
+    chunked_fields = ('video', 'trailer')
+
     class Meta:
         model = Movie
         fields = '__all__'
 
 
-class TvShowsForm(ModelForm):
+class TvShowsForm(ChunkedUploadFormMixin, ModelForm):
+    chunked_fields = ('video', 'trailer')
+
     class Meta:
         model = TvShows
         fields = '__all__'
 
 
-class EpisodeForm(ModelForm):
+class EpisodeForm(ChunkedUploadFormMixin, ModelForm):
+    chunked_fields = ('video',)
+
     class Meta:
         model = Episode
         fields = '__all__'
@@ -299,7 +612,7 @@ def admin_movies(request):
 
 @admin_required
 def add_movie(request):
-    form = MovieForm(request.POST or None, request.FILES or None)
+    form = MovieForm(request.POST or None, request.FILES or None, user=request.user)
     if form.is_valid():
         form.save()
         return redirect('admin_movies')
@@ -314,7 +627,7 @@ def admin_shows(request):
 
 @admin_required
 def add_show(request):
-    form = TvShowsForm(request.POST or None, request.FILES or None)
+    form = TvShowsForm(request.POST or None, request.FILES or None, user=request.user)
     if form.is_valid():
         form.save()
         return redirect('admin_shows')
@@ -323,13 +636,102 @@ def add_show(request):
 
 @admin_required
 def add_episode(request):
-    form = EpisodeForm(request.POST or None, request.FILES or None)
+    form = EpisodeForm(request.POST or None, request.FILES or None, user=request.user)
     if form.is_valid():
         form.save()
         return redirect('admin_shows')
     return render(request, 'admin_panel/add_episode.html', {'form': form})
 
 
+# ==========================================================
+# 📈 METRICS (PROMETHEUS)
+# ==========================================================
+
+@admin_required
+def metrics_view(request):
+    return HttpResponse(
+        metrics.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+# ==========================================================
+# 📤 CHUNKED UPLOADS (ADMIN PANEL)
+# ==========================================================
+
+def upload_state(upload):
+    return {
+        'id': str(upload.pk),
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.offset,
+        'completed': upload.completed,
+        'sha256': upload.sha256,
+        'chunk_size': max_chunk_size(),
+    }
+
+
+@admin_required
+@require_POST
+def upload_start(request):
+    try:
+        data = json.loads(request.body)
+        filename = str(data['filename'])
+        size = int(data['size'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'filename and size are required'}, status=400)
+
+    if size <= 0:
+        return JsonResponse({'error': 'size must be positive'}, status=400)
+
+    upload = start_upload(request.user, filename, size)
+    return JsonResponse(upload_state(upload), status=201)
+
+
+@admin_required
+@require_http_methods(['GET', 'PUT'])
+def upload_chunk(request, upload_id):
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+
+    if request.method == 'GET':
+        return JsonResponse(upload_state(upload))
+
+    try:
+        offset = int(request.GET['offset'])
+        length = int(request.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'offset and Content-Length are required'}, status=400)
+
+    try:
+        write_chunk(upload, offset, request, length)
+    except UploadConflict:
+        return JsonResponse(upload_state(upload), status=409)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=413)
+
+    return JsonResponse(upload_state(upload))
+
+
+@admin_required
+@require_POST
+def upload_finalize(request, upload_id):
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+
+    try:
+        sha256 = str(json.loads(request.body).get('sha256') or '')
+    except (ValueError, AttributeError):
+        sha256 = ''
+
+    try:
+        finalize_upload(upload, sha256)
+    except UploadConflict:
+        return JsonResponse(upload_state(upload), status=409)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=422)
+
+    return JsonResponse(upload_state(upload))
+
+
 # ==========================================================
 # 🔑 AUTH SYSTEM
 # ==========================================================
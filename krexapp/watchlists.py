@@ -0,0 +1,226 @@
+"""
+Watchlist membership per user.
+
+The detail pages' + / ✓ buttons and the badges on rail cards ask whether
+titles are on the signed-in user's watchlist. Each user's saved movie and
+show IDs are loaded with one query and kept in the cache as two sorted
+integer arrays, eight bytes a title, then turned into frozensets once per
+request: checking a whole rail is a set lookup per card, not a query.
+
+Writes go through ``add()`` and ``remove()``: one INSERT ... SELECT of
+the titles that exist, skipping rows conflicting with the
+``unique_user_movie`` / ``unique_user_tvshow`` constraints, or one
+DELETE, so a repeated or racing request is harmless. Each drops the
+user's cached entry, to be reloaded by the next page that checks
+membership. Deleting a title or a user drops the entries of everyone
+whose rows the cascade takes with it (signals.py).
+
+Rows carry a copy of their title's language and release year, so
+``page()`` can filter and sort the user's movies and shows together on
+the ``watchlist_user_*`` indexes and keyset-paginate any of its orders.
+"""
+
+from array import array
+
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from . import pagecache, rails
+from .models import Watchlist
+from .pagination import DEFAULT_SIZE, paginate
+
+CACHE_TIMEOUT = 60 * 60 * 24
+MAX_BULK = 500  # titles per add or remove
+
+# catalog -> Watchlist field
+FIELDS = {'movies': 'movie', 'shows': 'tvshow'}
+
+# Title fields copied onto saved rows
+COPIED_FIELDS = frozenset({'language', 'release_year'})
+
+# Each matches one of the Watchlist indexes after its user column
+SORTS = {
+    'added': ('-added_on', '-id'),
+    'year': ('-release_year', '-added_on', '-id'),
+    'language': ('language', '-added_on', '-id'),
+}
+
+
+def membership_key(user_id):
+    return f'watchlist:{user_id}'
+
+
+class Membership:
+    def __init__(self, movies=(), shows=()):
+        self.movies = frozenset(movies)
+        self.shows = frozenset(shows)
+
+    @property
+    def movie_ids(self):
+        return sorted(self.movies)
+
+    @property
+    def show_ids(self):
+        return sorted(self.shows)
+
+
+EMPTY = Membership()
+
+
+# ================= LOADING =================
+
+def load(user_id):
+    """``(movie_ids, show_ids)`` as sorted arrays, from the cache when possible."""
+    key = membership_key(user_id)
+
+    cached = cache.get(key)
+    if cached is None:
+        rows = Watchlist.objects.filter(user_id=user_id).values_list('movie_id', 'tvshow_id')
+        movies, shows = set(), set()
+        for movie_id, tvshow_id in rows:
+            if movie_id is not None:
+                movies.add(movie_id)
+            if tvshow_id is not None:
+                shows.add(tvshow_id)
+
+        cached = (array('q', sorted(movies)), array('q', sorted(shows)))
+        cache.set(key, cached, CACHE_TIMEOUT)
+    return cached
+
+
+def for_user(user):
+    if not user.is_authenticated:
+        return EMPTY
+    return Membership(*load(user.pk))
+
+
+def for_request(request):
+    """The signed-in user's membership, loaded at most once per request."""
+    if not hasattr(request, '_watchlist_membership'):
+        request._watchlist_membership = for_user(request.user)
+    return request._watchlist_membership
+
+
+# ================= WRITES =================
+
+def add(user_id, catalog, ids):
+    """Save titles; returns the IDs that exist, saved now or before."""
+    ids = set(ids)
+    if not ids:
+        return []
+
+    field = FIELDS[catalog]
+    model = rails.CATALOGS[catalog]
+    # Through the router, which pins the session to the primary
+    connection = connections[router.db_for_write(Watchlist)]
+    quote = connection.ops.quote_name
+
+    def column(owner, name):
+        return quote(owner._meta.get_field(name).column)
+
+    # One statement: a title deleted since a separate SELECT would fail
+    # the INSERT's foreign key, where here it is just not selected
+    # (SQLite needs the WHERE to parse ON CONFLICT after a SELECT)
+    sql = (
+        f'INSERT INTO {quote(Watchlist._meta.db_table)} '
+        f'({column(Watchlist, "user")}, {column(Watchlist, field)}, {column(Watchlist, "added_on")}, '
+        f'{column(Watchlist, "language")}, {column(Watchlist, "release_year")}) '
+        f'SELECT %s, {column(model, "id")}, %s, {column(model, "language")}, {column(model, "release_year")} '
+        f'FROM {quote(model._meta.db_table)} '
+        f'WHERE {column(model, "id")} IN ({", ".join(["%s"] * len(ids))}) '
+        f'ON CONFLICT DO NOTHING'
+    )
+    added_on = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, added_on, *ids])
+        inserted = cursor.rowcount
+
+    if inserted:
+        invalidate(user_id)
+    if inserted == len(ids):
+        return list(ids)
+    # Some were saved before, or don't exist
+    return list(
+        Watchlist.objects.filter(user_id=user_id, **{f'{field}_id__in': ids})
+        .values_list(f'{field}_id', flat=True)
+    )
+
+
+def remove(user_id, catalog, ids):
+    """Unsave titles; returns how many were saved."""
+    # No delete signals on Watchlist, so this stays a single DELETE
+    deleted, _ = Watchlist.objects.filter(
+        user_id=user_id, **{f'{FIELDS[catalog]}_id__in': set(ids)}
+    ).delete()
+    if deleted:
+        invalidate(user_id)
+    return deleted
+
+
+def toggle(user_id, catalog, object_id):
+    """Flip one title; returns whether it is now saved, or None if it doesn't exist."""
+    if remove(user_id, catalog, [object_id]):
+        return False
+    return True if add(user_id, catalog, [object_id]) else None
+
+
+def copy_title(title):
+    """Refresh the rows saving ``title`` after it is edited."""
+    field = FIELDS[rails.catalog_of(type(title))]
+    Watchlist.objects.filter(**{field: title}).exclude(
+        language=title.language, release_year=title.release_year
+    ).update(language=title.language, release_year=title.release_year)
+
+
+# ================= PAGES =================
+
+def items(user_id, kind='', language='', year=None):
+    """The user's watchlist rows, optionally of one kind, language or year."""
+    rows = Watchlist.objects.filter(user_id=user_id)
+    if kind:
+        rows = rows.filter(**{f'{FIELDS[kind]}__isnull': False})
+    if language:
+        rows = rows.filter(language=language)
+    if year is not None:
+        rows = rows.filter(release_year=year)
+    return rows
+
+
+def page(user_id, cursor=None, size=DEFAULT_SIZE, sort='added', **filters):
+    """One page of the user's movies and shows as ``(rows, next_cursor)``."""
+    rows = items(user_id, **filters).select_related('movie', 'tvshow')
+    return paginate(rows, SORTS[sort], cursor, size)
+
+
+def languages(user_id):
+    return list(
+        Watchlist.objects.filter(user_id=user_id).exclude(language='')
+        .order_by('language').values_list('language', flat=True).distinct()
+    )
+
+
+def years(user_id):
+    return list(
+        Watchlist.objects.filter(user_id=user_id).exclude(release_year=0)
+        .order_by('-release_year').values_list('release_year', flat=True).distinct()
+    )
+
+
+# ================= INVALIDATION =================
+
+def invalidate_title(title):
+    """Drop the entries of every user who saved ``title``, before it is deleted."""
+    field = FIELDS[rails.catalog_of(type(title))]
+    for user_id in Watchlist.objects.filter(**{field: title}).values_list('user_id', flat=True):
+        invalidate(user_id)
+
+
+def invalidate(user_id):
+    key = membership_key(user_id)
+    cache.delete(key)
+    # A page loading the old rows before the write commits could put
+    # them back, so drop the entry again once it has
+    transaction.on_commit(lambda: cache.delete(key))
+    # Pages showing the watchlist button are no longer Not Modified
+    transaction.on_commit(lambda: pagecache.touch_user(user_id))